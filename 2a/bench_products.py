@@ -0,0 +1,54 @@
+"""
+Benchmark de la búsqueda de productos por ID.
+
+Compara el recorrido lineal de la lista que hacían antes los manejadores con
+`ProductStore.get` (índice por ID, el mismo tipo de índice que usa 2c/ej2c1.py) para
+catálogos de 10, 10.000 y 1.000.000 de productos. Se buscan IDs repartidos por todo el
+catálogo y uno inexistente, que es el peor caso del recorrido lineal.
+
+Uso: python bench_products.py [--sizes 10 10000 1000000] [--lookups 200]
+"""
+
+import argparse
+import random
+import timeit
+
+from products import ProductStore
+
+
+def linear_get(products, product_id):
+    for product in products:
+        if product["id"] == product_id:
+            return product
+    return None
+
+
+def measure(function, ids, repeat=3):
+    """
+    Devuelve la latencia media por búsqueda en microsegundos (mejor de `repeat`)
+    """
+    timer = timeit.Timer(lambda: [function(product_id) for product_id in ids])
+    return min(timer.repeat(repeat=repeat, number=1)) / len(ids) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 10_000, 1_000_000])
+    parser.add_argument("--lookups", type=int, default=200, help="búsquedas por medida")
+    args = parser.parse_args()
+
+    print(f"{'productos':>10} {'lista (µs)':>12} {'índice (µs)':>12}")
+    for size in args.sizes:
+        products = [{"id": i, "name": f"Producto {i}", "price": float(i % 1000)}
+                    for i in range(1, size + 1)]
+        store = ProductStore(products)
+        ids = [random.randint(1, size) for _ in range(args.lookups - 1)] + [size + 1]
+        # El recorrido lineal con un millón de productos es lento: basta con menos búsquedas
+        linear_ids = ids if size <= 10_000 else ids[-10:]
+        linear = measure(lambda product_id: linear_get(products, product_id), linear_ids)
+        indexed = measure(store.get, ids)
+        print(f"{size:>10} {linear:>12.2f} {indexed:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark de los modos de concurrencia de los servidores de 2a.
+
+Arranca los servidores de ej2a1 (MyHTTPRequestHandler) y ej2a2 (ProductAPIHandler) en
+cada modo de `build_server` y con distinto número de workers, los somete a carga desde
+varios procesos cliente durante unos segundos y muestra las peticiones por segundo.
+Cada petición abre su propia conexión, para que todos los modos se comparen igual; las
+rechazadas (503 en el modo "pool" con la cola llena) o fallidas se cuentan aparte.
+
+Uso: python bench_servers.py [--duration 2] [--clients 8] [--workers 1 2 4 8]
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import socket
+import threading
+import time
+
+from ej2a1 import create_server as create_hello_server
+from ej2a2 import create_server as create_product_server
+
+SERVERS = {
+    "ej2a1 GET /": (create_hello_server, "/"),
+    "ej2a2 GET /product/1": (create_product_server, "/product/1"),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def client(port, path, duration):
+    """
+    Envía peticiones durante `duration` segundos y devuelve (correctas, fallidas)
+    """
+    ok = errors = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        conn = http.client.HTTPConnection("localhost", port, timeout=10)
+        try:
+            conn.request("GET", path, headers={"Connection": "close"})
+            response = conn.getresponse()
+            response.read()
+            if response.status == 200:
+                ok += 1
+            else:
+                errors += 1
+        except OSError:
+            errors += 1
+        finally:
+            conn.close()
+    return ok, errors
+
+
+def run(create, path, mode, workers, clients, duration, pool):
+    """
+    Mide un servidor en un modo. Devuelve (peticiones por segundo, fallidas), o None si
+    el modo no está disponible en esta plataforma.
+    """
+    port = free_port()
+    try:
+        server = create(host="localhost", port=port, mode=mode, workers=workers)
+    except ValueError:
+        return None
+    # Sin el registro de cada petición en stderr, que falsearía la medida
+    server.RequestHandlerClass = type(
+        "Quiet" + server.RequestHandlerClass.__name__,
+        (server.RequestHandlerClass,),
+        {"log_message": lambda self, format, *args: None},
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    try:
+        results = pool.starmap(client, [(port, path, duration)] * clients)
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(1)
+    return sum(ok for ok, _ in results) / duration, sum(errors for _, errors in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=2, help="segundos de carga por medida")
+    parser.add_argument("--clients", type=int, default=8, help="procesos cliente concurrentes")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    print(f"{'servidor':<22} {'modo':<10} {'workers':>7} {'req/s':>9} {'fallidas':>8}")
+    # Los clientes se crean con "spawn" para no heredar nada de los servidores
+    with multiprocessing.get_context("spawn").Pool(args.clients) as pool:
+        for name, (create, path) in SERVERS.items():
+            cases = [("single", None), ("threading", None)]
+            cases += [(mode, workers) for mode in ("pool", "prefork") for workers in args.workers]
+            for mode, workers in cases:
+                result = run(create, path, mode, workers, args.clients, args.duration, pool)
+                if result is None:
+                    print(f"{name:<22} {mode:<10} {workers or '-':>7} {'no disponible':>18}")
+                    continue
+                rate, errors = result
+                print(f"{name:<22} {mode:<10} {workers or '-':>7} {rate:>9.0f} {errors:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark de la serialización XML de ej2a3.
+
+Compara el camino original (árbol de ElementTree, `ET.tostring` y vuelta a parsear con
+minidom para formatearlo) con el escritor directo `xml_document`, compacto y sangrado,
+para un producto, y con `iter_xml_list` para listas grandes de productos.
+
+Uso: python bench_xml.py [--list-size 100000]
+"""
+
+import argparse
+import timeit
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+from ej2a3 import iter_xml_list, xml_document
+
+
+def minidom_document(tag, d):
+    """
+    Serialización original: árbol ElementTree, `ET.tostring` y formateo con minidom
+    """
+    elem = ET.Element(tag)
+    for key, val in d.items():
+        child = ET.SubElement(elem, key)
+        child.text = str(val)
+    rough_string = ET.tostring(elem, "utf-8")
+    return minidom.parseString(rough_string).toprettyxml(indent="  ").encode()
+
+
+def minidom_list(tag, item_tag, items):
+    root = ET.Element(tag)
+    for item in items:
+        elem = ET.SubElement(root, item_tag)
+        for key, val in item.items():
+            ET.SubElement(elem, key).text = str(val)
+    return minidom.parseString(ET.tostring(root, "utf-8")).toprettyxml(indent="  ").encode()
+
+
+def measure(function, number):
+    """
+    Devuelve el tiempo medio por llamada en microsegundos (mejor de 3 repeticiones)
+    """
+    return min(timeit.repeat(function, repeat=3, number=number)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--list-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    product = {"id": 1, "name": "Laptop & <accesorios>", "price": 999.99}
+    print("Un producto (µs por respuesta)")
+    print(f"  {'minidom':<22} {measure(lambda: minidom_document('product', product), 2000):>10.2f}")
+    print(f"  {'xml_document':<22} {measure(lambda: xml_document('product', product), 2000):>10.2f}")
+    print(f"  {'xml_document sangrado':<22} "
+          f"{measure(lambda: xml_document('product', product, indent='  '), 2000):>10.2f}")
+
+    products = [{"id": i, "name": f"Producto {i}", "price": float(i % 1000)}
+                for i in range(1, args.list_size + 1)]
+    print(f"Lista de {args.list_size} productos (ms)")
+    print(f"  {'minidom':<22} "
+          f"{measure(lambda: minidom_list('products', 'product', products), 1) / 1000:>10.1f}")
+    print(f"  {'iter_xml_list':<22} "
+          f"{measure(lambda: b''.join(iter_xml_list('products', 'product', products)), 1) / 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -13,7 +13,12 @@ Tu tarea es completar la implementación de la clase MyHTTPRequestHandler.
 Nota: Si deseas cambiar el idioma del ejercicio, edita el archivo de test correspondiente (ej2a1_test.py).
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
+from servers import build_server
+from routing import Router
+
+# Tabla de rutas del servidor
+router = Router()
 
 class MyHTTPRequestHandler(BaseHTTPRequestHandler):
     """
@@ -29,27 +34,49 @@ class MyHTTPRequestHandler(BaseHTTPRequestHandler):
         Para otras rutas, devuelve un código de estado 404 (Not Found).
         """
         # Implementa aquí la lógica para responder a las peticiones GET
-        # 1. Verifica la ruta solicitada (self.path)
-        # 2. Si la ruta es "/", envía una respuesta 200 con el mensaje "¡Hola mundo!"
+        # 1. Busca en la tabla de rutas la función que atiende la ruta solicitada (self.path)
+        # 2. Si la ruta es "/", se llama a hello, que envía una respuesta 200 con el mensaje "¡Hola mundo!"
         # 3. Si la ruta es cualquier otra, envía una respuesta 404
-        if self.path == "/":
-            self.send_response(200)
-            self.send_header("Content-type", "text/plain")
-            self.end_headers()
-            self.wfile.write("¡Hola mundo!".encode())
-        else:
+        match = router.match("GET", self.path)
+        if match is None:
             self.send_response(404)
             self.send_header("Content-type", "text/plain")
             self.end_headers()
             self.wfile.write("Not Found".encode())
+        elif match.handler is None:
+            # La ruta existe pero no admite GET
+            self.send_response(405)
+            self.send_header("Content-type", "text/plain")
+            self.send_header("Allow", ", ".join(match.allowed))
+            self.end_headers()
+            self.wfile.write("Method Not Allowed".encode())
+        else:
+            match.handler(self, **match.params)
+
+    @router.route("/")
+    def hello(self):
+        """
+        Responde con el mensaje "¡Hola mundo!" en texto plano
+        """
+        self.send_response(200)
+        self.send_header("Content-type", "text/plain")
+        self.end_headers()
+        self.wfile.write("¡Hola mundo!".encode())
 
 
-def create_server(host="localhost", port=8000):
+def create_server(host="localhost", port=8000, mode="single", workers=None, backend="socketserver"):
     """
     Crea y configura el servidor HTTP
+
+    El parámetro `mode` selecciona el modelo de concurrencia: "single" (por defecto),
+    "threading", "pool" o "prefork". `workers` indica el número de hilos o procesos
+    en los modos "pool" y "prefork".
+
+    Con `backend="asyncio"` las peticiones se atienden desde un bucle de eventos de
+    asyncio en lugar de con `socketserver`.
     """
     server_address = (host, port)
-    httpd = HTTPServer(server_address, MyHTTPRequestHandler)
+    httpd = build_server(server_address, MyHTTPRequestHandler, mode=mode, workers=workers, backend=backend)
     return httpd
 
 def run_server(server):
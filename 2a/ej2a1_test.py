@@ -42,3 +42,40 @@ def test_nonexistent_endpoint(server):
     """
     response = requests.get("http://localhost:8888/nonexistent")
     assert response.status_code == 404, "El código de estado debe ser 404 para rutas inexistentes."
+
+@pytest.mark.parametrize("mode,backend", [
+    ("threading", "socketserver"),
+    ("pool", "socketserver"),
+    ("prefork", "socketserver"),
+    ("single", "asyncio"),
+])
+def test_server_modes(mode, backend):
+    """
+    Prueba que los distintos modos de concurrencia y backends responden igual que el servidor básico.
+    """
+    try:
+        server = create_server(host="localhost", port=8891, mode=mode, workers=2, backend=backend)
+    except ValueError:
+        pytest.skip(f"El modo {mode} no está disponible en esta plataforma")
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    time.sleep(0.5)
+
+    try:
+        for _ in range(4):
+            response = requests.get("http://localhost:8891/")
+            assert response.status_code == 200, "El código de estado debe ser 200."
+            assert "Hola mundo" in response.text, "El mensaje debe contener 'Hola mundo'."
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(1)
+
+def test_invalid_mode():
+    """
+    Prueba que un modo desconocido produce un ValueError.
+    """
+    with pytest.raises(ValueError):
+        create_server(host="localhost", port=8891, mode="invalid")
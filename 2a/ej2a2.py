@@ -18,9 +18,12 @@ Ejemplo:
 2. Una solicitud `GET /product/999` debe devolver un mensaje de error con código 404.
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import BaseHTTPRequestHandler
+from servers import build_server
+from products import ProductStore
+from responses import make_cached_response, send_cached_response
+from routing import Router
 import json
-import re
 
 # Lista de productos predefinida
 products = [
@@ -29,12 +32,46 @@ products = [
     {"id": 3, "name": "Tablet", "price": 349.99}
 ]
 
+# Índice de productos por ID para búsquedas en tiempo constante
+product_store = ProductStore(products)
+
+
+def build_json_response(product):
+    """
+    Serializa un producto como respuesta JSON cacheable
+    """
+    return make_cached_response(json.dumps(product).encode(), "application/json")
+
+
+# Tabla de rutas de la API
+router = Router()
+
 
 class ProductAPIHandler(BaseHTTPRequestHandler):
     """
     Manejador de peticiones HTTP para la API de productos
     """
 
+    # HTTP/1.1 mantiene la conexión abierta entre peticiones (keep-alive) y permite
+    # que el cliente encadene varias peticiones sin esperar cada respuesta (pipelining)
+    protocol_version = "HTTP/1.1"
+    # Segundos de inactividad tras los que se cierra una conexión persistente
+    timeout = 15
+
+    def send_json(self, status, data, headers=None):
+        """
+        Envía una respuesta JSON con su Content-Length exacto, necesario para que
+        el cliente sepa dónde termina el cuerpo y pueda reutilizar la conexión
+        """
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_GET(self):
         """
         Método que se ejecuta cuando se recibe una petición GET.
@@ -42,44 +79,45 @@ class ProductAPIHandler(BaseHTTPRequestHandler):
         con los datos del producto en formato JSON si existe, o un error 404 si no existe.
         """
         # Implementa aquí la lógica para responder a las peticiones GET
-        # 1. Usa una expresión regular para verificar si la ruta coincide con /product/<id>
-        # 2. Si coincide, extrae el ID del producto de la ruta
-        # 3. Busca el producto en la lista
-        # 4. Si el producto existe, devuélvelo en formato JSON con código 200
-        # 5. Si el producto no existe, devuelve un mensaje de error con código 404
-        match = re.match(r'^/product/(\d+)$', self.path)
-        
-        if match:
-            product_id = int(match.group(1))
-            # Buscar el producto
-            product = None
-            for p in products:
-                if p["id"] == product_id:
-                    product = p
-                    break
-            
-            if product:
-                self.send_response(200)
-                self.send_header("Content-type", "application/json")
-                self.end_headers()
-                self.wfile.write(json.dumps(product).encode())
-            else:
-                self.send_response(404)
-                self.send_header("Content-type", "application/json")
-                self.end_headers()
-                self.wfile.write(json.dumps({"error": "Product not found"}).encode())
+        # 1. Busca en la tabla de rutas la función que atiende la ruta /product/<id>
+        # 2. Si la encuentra, llámala con el ID del producto extraído de la ruta
+        # 3. Si ninguna ruta coincide, devuelve un mensaje de error con código 404
+        match = router.match("GET", self.path)
+        if match is None:
+            self.send_json(404, {"error": "Not Found"})
+        elif match.handler is None:
+            # La ruta existe pero no admite GET
+            self.send_json(405, {"error": "Method Not Allowed"}, {"Allow": ", ".join(match.allowed)})
+        else:
+            match.handler(self, **match.params)
+
+    @router.route("/product/<int:product_id>")
+    def get_product(self, product_id):
+        """
+        Devuelve el producto en formato JSON con código 200, o un error 404 si no existe
+        """
+        # Buscar el producto (la respuesta JSON se serializa una sola vez por producto)
+        cached = product_store.cached_response(product_id, "json", build_json_response)
+        if cached:
+            send_cached_response(self, cached)
         else:
-            self.send_response(404)
-            self.send_header("Content-type", "application/json")
-            self.end_headers()
-            self.wfile.write(json.dumps({"error": "Not Found"}).encode())
+            self.send_json(404, {"error": "Product not found"})
 
-def create_server(host="localhost", port=8000):
+def create_server(host="localhost", port=8000, mode="threading", workers=None, backend="socketserver"):
     """
     Crea y configura el servidor HTTP
+
+    El parámetro `mode` selecciona el modelo de concurrencia: "single", "threading"
+    (por defecto), "pool" o "prefork". `workers` indica el número de hilos o procesos
+    en los modos "pool" y "prefork". Como el manejador mantiene las conexiones abiertas
+    (keep-alive), en modo "single" un cliente inactivo bloquearía al resto hasta que
+    venciera su `timeout`.
+
+    Con `backend="asyncio"` las peticiones se atienden desde un bucle de eventos de
+    asyncio en lugar de con `socketserver`.
     """
     server_address = (host, port)
-    httpd = HTTPServer(server_address, ProductAPIHandler)
+    httpd = build_server(server_address, ProductAPIHandler, mode=mode, workers=workers, backend=backend)
     return httpd
 
 def run_server(server):
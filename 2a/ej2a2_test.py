@@ -3,15 +3,22 @@ import threading
 import requests
 import time
 import json
-from ej2a2 import create_server
+import http.client
+import socket
+import ej2a2
+from ej2a2 import ProductAPIHandler, create_server
+from products import ProductStore
+from routing import Router
+from servers import ThreadPoolHTTPServer
 
-@pytest.fixture
-def server():
+@pytest.fixture(params=["socketserver", "asyncio"])
+def server(request):
     """
-    Fixture para iniciar y detener el servidor HTTP durante las pruebas
+    Fixture para iniciar y detener el servidor HTTP durante las pruebas,
+    con cada uno de los backends disponibles
     """
     # Crear el servidor en un puerto específico para pruebas
-    server = create_server(host="localhost", port=8889)
+    server = create_server(host="localhost", port=8889, backend=request.param)
 
     # Iniciar el servidor en un hilo separado
     thread = threading.Thread(target=server.serve_forever)
@@ -67,3 +74,177 @@ def test_invalid_route(server):
     """
     response = requests.get("http://localhost:8889/invalid")
     assert response.status_code == 404, "El código de estado debe ser 404 para rutas inválidas."
+
+def test_keep_alive(server):
+    """
+    Prueba que varias peticiones reutilizan la misma conexión HTTP/1.1
+    """
+    conn = http.client.HTTPConnection("localhost", 8889)
+    try:
+        for product_id, status in [(1, 200), (999, 404), (2, 200)]:
+            conn.request("GET", f"/product/{product_id}")
+            response = conn.getresponse()
+            body = response.read()
+            assert response.status == status
+            assert response.version == 11, "La respuesta debe usar HTTP/1.1"
+            assert int(response.getheader("Content-Length")) == len(body)
+            assert not response.will_close, "La conexión debe mantenerse abierta"
+    finally:
+        conn.close()
+
+def test_pipelining(server):
+    """
+    Prueba que se responden en orden varias peticiones enviadas de golpe por la misma conexión
+    """
+    with socket.create_connection(("localhost", 8889), timeout=5) as sock:
+        sock.sendall(
+            b"GET /product/1 HTTP/1.1\r\nHost: localhost\r\n\r\n"
+            b"GET /product/3 HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+        )
+        data = b""
+        while chunk := sock.recv(4096):
+            data += chunk
+    assert data.count(b"HTTP/1.1 200") == 2
+    assert data.index(b'"Laptop"') < data.index(b'"Tablet"')
+
+def test_pool_overload_rejected():
+    """
+    Prueba que, con el pool y su cola llenos, las conexiones nuevas reciben un 503 y el
+    servidor se sigue pudiendo detener
+    """
+    server = ThreadPoolHTTPServer(("localhost", 8892), ProductAPIHandler, workers=1, backlog=0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    busy = http.client.HTTPConnection("localhost", 8892)
+    try:
+        # La conexión persistente ocupa el único hilo del pool
+        busy.request("GET", "/product/1")
+        assert busy.getresponse().read()
+        with socket.create_connection(("localhost", 8892), timeout=5) as sock:
+            sock.sendall(b"GET /product/1 HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            assert sock.recv(4096).startswith(b"HTTP/1.1 503")
+    finally:
+        busy.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(1)
+    assert not thread.is_alive()
+
+def test_prefork_idle_keep_alive_does_not_block():
+    """
+    Prueba que, en modo "prefork", una conexión keep-alive inactiva no bloquea al
+    proceso que la atiende
+    """
+    try:
+        server = create_server(host="localhost", port=8893, mode="prefork", workers=1)
+    except ValueError:
+        pytest.skip("El modo prefork no está disponible en esta plataforma")
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    idle = http.client.HTTPConnection("localhost", 8893)
+    try:
+        idle.request("GET", "/product/1")
+        assert idle.getresponse().read()
+        # La primera conexión sigue abierta sin enviar nada
+        response = requests.get("http://localhost:8893/product/2", timeout=5)
+        assert response.status_code == 200
+    finally:
+        idle.close()
+        server.shutdown()
+        server.server_close()
+        thread.join(1)
+
+def test_product_store_from_file(tmp_path):
+    """
+    Prueba la carga del almacén de productos desde ficheros JSON Lines y CSV
+    y el mantenimiento del índice al modificarlo
+    """
+    jsonl = tmp_path / "products.jsonl"
+    jsonl.write_text('{"id": 1, "name": "Laptop", "price": 999.99}\n{"id": 7, "name": "Monitor", "price": 199.5}\n')
+    store = ProductStore.from_file(jsonl)
+    assert len(store) == 2
+    assert store.get(7) == {"id": 7, "name": "Monitor", "price": 199.5}
+
+    csv_file = tmp_path / "products.csv"
+    csv_file.write_text("id,name,price\n3,Tablet,349.99\n")
+    store = ProductStore.from_file(csv_file)
+    assert store.get(3) == {"id": 3, "name": "Tablet", "price": 349.99}
+
+    store.update(3, price=299.99)
+    assert store.get(3)["price"] == 299.99
+    store.remove(3)
+    assert store.get(3) is None
+
+def test_etag_not_modified(server):
+    """
+    Prueba que la respuesta incluye un ETag y que una petición condicional con ese ETag devuelve 304
+    """
+    response = requests.get("http://localhost:8889/product/1")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    response = requests.get("http://localhost:8889/product/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304, "Debe devolver 304 si el producto no ha cambiado."
+    assert response.content == b""
+
+def test_cached_response_invalidated():
+    """
+    Prueba que la respuesta cacheada de un producto se descarta al modificarlo
+    """
+    store = ProductStore([{"id": 1, "name": "Laptop", "price": 999.99}])
+    build = lambda product: json.dumps(product).encode()
+    assert store.cached_response(1, "json", build) is store.cached_response(1, "json", build)
+
+    store.update(1, price=899.99)
+    assert json.loads(store.cached_response(1, "json", build))["price"] == 899.99
+    assert store.cached_response(999, "json", build) is None
+
+def test_query_string_and_trailing_slash(server):
+    """
+    Prueba que la query string y la barra final no impiden encontrar el producto
+    """
+    for path in ["/product/1?x=1", "/product/1/", "/product/1/?x=1"]:
+        response = requests.get(f"http://localhost:8889{path}")
+        assert response.status_code == 200, f"El código de estado debe ser 200 para {path}."
+        assert response.json()["id"] == 1
+
+    response = requests.get("http://localhost:8889/product/abc")
+    assert response.status_code == 404, "Un ID no numérico no debe coincidir con la ruta."
+
+def test_router():
+    """
+    Prueba la tabla de rutas: parámetros tipados, prioridad de rutas fijas y selección por método
+    """
+    router = Router()
+    router.add("/product/<int:product_id>", "get_product")
+    router.add("/product/<int:product_id>", "delete_product", methods=("DELETE",))
+    router.add("/product/featured", "featured")
+    router.add("/user/<name>/price/<float:value>", "user_price")
+    for i in range(300):
+        router.add(f"/route{i}/<int:item_id>", f"route{i}")
+
+    match = router.match("GET", "/product/7")
+    assert match.handler == "get_product" and match.params == {"product_id": 7}
+    assert router.match("DELETE", "/product/7").handler == "delete_product"
+    assert router.match("GET", "/product/featured").handler == "featured"
+    assert router.match("GET", "/user/ana%20m/price/9.5").params == {"name": "ana m", "value": 9.5}
+    assert router.match("GET", "/route299/3").handler == "route299"
+
+    match = router.match("PUT", "/product/7")
+    assert match.handler is None
+    assert set(match.allowed) == {"GET", "DELETE"}
+    assert router.match("GET", "/product/7/extra") is None
+
+def test_method_not_allowed(server, monkeypatch):
+    """
+    Prueba que una ruta que existe pero no admite GET devuelve 405 con la cabecera Allow
+    """
+    router = Router()
+    router.add("/product/<int:product_id>", "delete_product", methods=("DELETE", "PUT"))
+    monkeypatch.setattr(ej2a2, "router", router)
+    response = requests.get("http://localhost:8889/product/1")
+    assert response.status_code == 405
+    assert response.headers["Allow"] == "DELETE, PUT"
+    assert requests.get("http://localhost:8889/invalid").status_code == 404
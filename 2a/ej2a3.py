@@ -18,10 +18,14 @@ Ejemplo:
 2. Una solicitud `GET /product/999` debe devolver un mensaje de error con código 404.
 """
 
-from http.server import HTTPServer, BaseHTTPRequestHandler
-import re
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from http.server import BaseHTTPRequestHandler
+from servers import build_server
+from products import ProductStore
+from responses import make_cached_response, send_cached_response
+from routing import Router
+from xml.sax.saxutils import escape
+
+XML_DECLARATION = '<?xml version="1.0" encoding="utf-8"?>'
 
 # Lista de productos predefinida
 products = [
@@ -30,29 +34,98 @@ products = [
     {"id": 3, "name": "Tablet", "price": 349.99}
 ]
 
-def dict_to_xml(tag, d):
+# Índice de productos por ID para búsquedas en tiempo constante
+product_store = ProductStore(products)
+
+def xml_element(tag, value, indent=None, level=0):
+    """
+    Serializa directamente a texto XML un valor simple o un diccionario, sin construir
+    ningún árbol intermedio. Los textos se escapan (&, < y >). Por defecto la salida
+    es compacta; con `indent` (por ejemplo "  ") se sangra cada nivel.
+    """
+    if not isinstance(value, dict):
+        return f"<{tag}>{escape(str(value))}</{tag}>"
+    if indent is None:
+        children = "".join(xml_element(key, val) for key, val in value.items())
+        return f"<{tag}>{children}</{tag}>"
+    inner = "\n" + indent * (level + 1)
+    children = "".join(inner + xml_element(key, val, indent, level + 1) for key, val in value.items())
+    return f"<{tag}>{children}\n{indent * level}</{tag}>"
+
+def xml_document(tag, value, indent=None):
+    """
+    Devuelve un documento XML completo (con declaración) codificado en UTF-8
+    """
+    separator = "" if indent is None else "\n"
+    return (XML_DECLARATION + separator + xml_element(tag, value, indent) + separator).encode()
+
+def iter_xml_list(tag, item_tag, items, indent=None):
     """
-    Convierte un diccionario en un elemento XML
+    Genera un documento XML con una lista de elementos fragmento a fragmento, de forma
+    que una lista muy grande se puede enviar sin serializarla entera en memoria
     """
-    elem = ET.Element(tag)
-    for key, val in d.items():
-        child = ET.SubElement(elem, key)
-        child.text = str(val)
-    return elem
+    separator = "" if indent is None else "\n"
+    prefix = separator + (indent or "")
+    yield (XML_DECLARATION + separator + f"<{tag}>").encode()
+    for item in items:
+        yield (prefix + xml_element(item_tag, item, indent, 1)).encode()
+    yield (separator + f"</{tag}>" + separator).encode()
 
-def prettify(elem):
+def build_xml_response(product):
     """
-    Devuelve una cadena XML formateada bonita
+    Serializa un producto como respuesta XML cacheable
     """
-    rough_string = ET.tostring(elem, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ").encode()
+    return make_cached_response(xml_document("product", product), "application/xml")
+
+# Respuestas de error, serializadas una sola vez
+PRODUCT_NOT_FOUND = xml_document("error", "Product not found")
+NOT_FOUND = xml_document("error", "Not Found")
+METHOD_NOT_ALLOWED = xml_document("error", "Method Not Allowed")
+
+# Tabla de rutas de la API
+router = Router()
 
 class ProductAPIHandler(BaseHTTPRequestHandler):
     """
     Manejador de peticiones HTTP para la API de productos en XML
     """
 
+    # Conexiones persistentes (keep-alive) y peticiones encadenadas (pipelining)
+    protocol_version = "HTTP/1.1"
+    # Segundos de inactividad tras los que se cierra una conexión persistente
+    timeout = 15
+
+    def send_xml(self, status, body, headers=None):
+        """
+        Envía una respuesta XML ya serializada con su Content-Length exacto
+        """
+        self.send_response(status)
+        self.send_header("Content-type", "application/xml")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunked(self, content_type, chunks, buffer_size=16384):
+        """
+        Envía una respuesta de longitud desconocida con Transfer-Encoding: chunked.
+        Los fragmentos pequeños se agrupan hasta `buffer_size` bytes antes de escribirlos.
+        """
+        self.send_response(200)
+        self.send_header("Content-type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        buffer = bytearray()
+        for chunk in chunks:
+            buffer += chunk
+            if len(buffer) >= buffer_size:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(buffer), buffer))
+                buffer.clear()
+        if buffer:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(buffer), buffer))
+        self.wfile.write(b"0\r\n\r\n")
+
     def do_GET(self):
         """
         Método que se ejecuta cuando se recibe una petición GET.
@@ -60,51 +133,52 @@ class ProductAPIHandler(BaseHTTPRequestHandler):
         con los datos del producto en formato XML si existe, o un error 404 si no existe.
         """
         # Implementa aquí la lógica para responder a las peticiones GET
-        # 1. Usa una expresión regular para verificar si la ruta coincide con /product/<id>
-        # 2. Si coincide, extrae el ID del producto de la ruta
-        # 3. Busca el producto en la lista
-        # 4. Si el producto existe:
-        #    a. Convierte el producto a XML usando dict_to_xml y prettify
-        #    b. Devuelve el XML con código 200 y Content-Type application/xml
-        # 5. Si el producto no existe, devuelve un mensaje de error XML con código 404
-        match = re.match(r'^/product/(\d+)$', self.path)
-        
-        if match:
-            product_id = int(match.group(1))
-            # Buscar el producto
-            product = None
-            for p in products:
-                if p["id"] == product_id:
-                    product = p
-                    break
-            
-            if product:
-                self.send_response(200)
-                self.send_header("Content-type", "application/xml")
-                self.end_headers()
-                xml_elem = dict_to_xml("product", product)
-                self.wfile.write(prettify(xml_elem))
-            else:
-                self.send_response(404)
-                self.send_header("Content-type", "application/xml")
-                self.end_headers()
-                error_elem = ET.Element("error")
-                error_elem.text = "Product not found"
-                self.wfile.write(prettify(error_elem))
+        # 1. Busca en la tabla de rutas la función que atiende la ruta /product/<id>
+        # 2. Si la encuentra, llámala con el ID del producto extraído de la ruta
+        # 3. Si ninguna ruta coincide, devuelve un mensaje de error XML con código 404
+        match = router.match("GET", self.path)
+        if match is None:
+            self.send_xml(404, NOT_FOUND)
+        elif match.handler is None:
+            # La ruta existe pero no admite GET
+            self.send_xml(405, METHOD_NOT_ALLOWED, {"Allow": ", ".join(match.allowed)})
+        else:
+            match.handler(self, **match.params)
+
+    @router.route("/product/<int:product_id>")
+    def get_product(self, product_id):
+        """
+        Devuelve el producto en formato XML con código 200, o un error XML 404 si no existe
+        """
+        # Buscar el producto (la respuesta XML se serializa una sola vez por producto)
+        cached = product_store.cached_response(product_id, "xml", build_xml_response)
+        if cached:
+            send_cached_response(self, cached)
         else:
-            self.send_response(404)
-            self.send_header("Content-type", "application/xml")
-            self.end_headers()
-            error_elem = ET.Element("error")
-            error_elem.text = "Not Found"
-            self.wfile.write(prettify(error_elem))
-
-def create_server(host="localhost", port=8000):
+            self.send_xml(404, PRODUCT_NOT_FOUND)
+
+    @router.route("/products")
+    def get_products(self):
+        """
+        Devuelve todos los productos en XML, enviados por fragmentos
+        """
+        self.send_chunked("application/xml", iter_xml_list("products", "product", product_store))
+
+def create_server(host="localhost", port=8000, mode="threading", workers=None, backend="socketserver"):
     """
     Crea y configura el servidor HTTP
+
+    El parámetro `mode` selecciona el modelo de concurrencia: "single", "threading"
+    (por defecto), "pool" o "prefork". `workers` indica el número de hilos o procesos
+    en los modos "pool" y "prefork". Como el manejador mantiene las conexiones abiertas
+    (keep-alive), en modo "single" un cliente inactivo bloquearía al resto hasta que
+    venciera su `timeout`.
+
+    Con `backend="asyncio"` las peticiones se atienden desde un bucle de eventos de
+    asyncio en lugar de con `socketserver`.
     """
     server_address = (host, port)
-    httpd = HTTPServer(server_address, ProductAPIHandler)
+    httpd = build_server(server_address, ProductAPIHandler, mode=mode, workers=workers, backend=backend)
     return httpd
 
 def run_server(server):
@@ -3,15 +3,16 @@ import threading
 import requests
 import time
 import xml.etree.ElementTree as ET
-from ej2a3 import create_server
+from ej2a3 import create_server, xml_document, iter_xml_list
 
-@pytest.fixture
-def server():
+@pytest.fixture(params=["socketserver", "asyncio"])
+def server(request):
     """
-    Fixture para iniciar y detener el servidor HTTP durante las pruebas
+    Fixture para iniciar y detener el servidor HTTP durante las pruebas,
+    con cada uno de los backends disponibles
     """
     # Crear el servidor en un puerto específico para pruebas
-    server = create_server(host="localhost", port=8890)
+    server = create_server(host="localhost", port=8890, backend=request.param)
 
     # Iniciar el servidor en un hilo separado
     thread = threading.Thread(target=server.serve_forever)
@@ -87,3 +88,33 @@ def test_invalid_route(server):
 
     # Verificar que sea un XML de error
     assert "<error>" in response.text, "El XML debe contener un elemento 'error'"
+
+def test_get_products_streamed(server):
+    """
+    Prueba que GET /products devuelve la lista completa de productos en XML enviada por fragmentos
+    """
+    response = requests.get("http://localhost:8890/products")
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == "application/xml", "El Content-Type debe ser application/xml"
+    assert response.headers['Transfer-Encoding'] == "chunked"
+
+    root = ET.fromstring(response.content)
+    assert root.tag == "products"
+    assert [p.find("name").text for p in root] == ["Laptop", "Smartphone", "Tablet"]
+
+def test_xml_writer():
+    """
+    Prueba el serializador XML directo: escapado, sangrado opcional y generación por fragmentos
+    """
+    body = xml_document("product", {"id": 5, "name": "Cables & <adaptadores>"})
+    assert b"\n" not in body, "Por defecto la salida debe ser compacta"
+    root = ET.fromstring(body)
+    assert root.find("name").text == "Cables & <adaptadores>"
+
+    pretty = xml_document("product", {"id": 5}, indent="  ")
+    assert b"\n  <id>5</id>\n" in pretty
+
+    items = [{"id": i, "name": f"P{i}"} for i in range(100)]
+    chunks = list(iter_xml_list("products", "product", items))
+    assert len(chunks) == len(items) + 2
+    assert len(ET.fromstring(b"".join(chunks))) == 100
@@ -0,0 +1,111 @@
+"""
+Almacén de productos compartido por los ejercicios del apartado 2a.
+
+Mantiene un índice por ID (diccionario) para que buscar un producto cueste O(1)
+independientemente del tamaño del catálogo. El índice se actualiza en cada alta,
+modificación o baja, sin reconstruirlo entero.
+
+Además guarda las respuestas ya serializadas de cada producto (por ejemplo, en JSON
+o en XML) para no repetir la serialización en cada petición. Las respuestas de un
+producto se descartan en cuanto ese producto cambia.
+"""
+
+import csv
+import json
+import threading
+
+
+class ProductStore:
+    """
+    Colección de productos indexada por su campo "id"
+    """
+
+    def __init__(self, products=()):
+        self._by_id = {}
+        # product_id -> {representación: respuesta serializada}
+        self._responses = {}
+        self._lock = threading.Lock()
+        for product in products:
+            self.add(product)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Carga los productos desde un fichero JSON Lines (.jsonl, un producto por línea)
+        o CSV (.csv, con cabecera). El fichero se lee línea a línea, por lo que se
+        pueden cargar catálogos de millones de filas sin tenerlos en memoria dos veces.
+        """
+        store = cls()
+        with open(path, newline="", encoding="utf-8") as f:
+            if str(path).endswith(".csv"):
+                for row in csv.DictReader(f):
+                    row["id"] = int(row["id"])
+                    if "price" in row:
+                        row["price"] = float(row["price"])
+                    store.add(row)
+            else:
+                for line in f:
+                    if line.strip():
+                        store.add(json.loads(line))
+        return store
+
+    def get(self, product_id):
+        """
+        Devuelve el producto con el ID indicado o None si no existe
+        """
+        return self._by_id.get(product_id)
+
+    def add(self, product):
+        """
+        Añade un producto, o lo sustituye si ya existe otro con el mismo ID
+        """
+        with self._lock:
+            self._by_id[product["id"]] = product
+            self._responses.pop(product["id"], None)
+        return product
+
+    def update(self, product_id, **fields):
+        """
+        Modifica los campos de un producto existente. Lanza KeyError si no existe.
+        """
+        with self._lock:
+            product = {**self._by_id[product_id], **fields, "id": product_id}
+            self._by_id[product_id] = product
+            self._responses.pop(product_id, None)
+        return product
+
+    def remove(self, product_id):
+        """
+        Elimina un producto. Lanza KeyError si no existe.
+        """
+        with self._lock:
+            self._responses.pop(product_id, None)
+            return self._by_id.pop(product_id)
+
+    def cached_response(self, product_id, representation, build):
+        """
+        Devuelve la respuesta serializada de un producto en la representación indicada,
+        construyéndola con `build(product)` solo la primera vez. Devuelve None si el
+        producto no existe.
+        """
+        responses = self._responses.get(product_id)
+        if responses is not None and representation in responses:
+            return responses[representation]
+        with self._lock:
+            product = self._by_id.get(product_id)
+            if product is None:
+                return None
+            responses = self._responses.setdefault(product_id, {})
+            if representation not in responses:
+                responses[representation] = build(product)
+            return responses[representation]
+
+    def __contains__(self, product_id):
+        return product_id in self._by_id
+
+    def __iter__(self):
+        # Se recorre una copia para que las altas y bajas concurrentes no interfieran
+        return iter(list(self._by_id.values()))
+
+    def __len__(self):
+        return len(self._by_id)
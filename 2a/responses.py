@@ -0,0 +1,46 @@
+"""
+Respuestas HTTP preconstruidas para los ejercicios del apartado 2a.
+
+Una `CachedResponse` guarda ya codificados el bloque de cabeceras y el cuerpo de una
+respuesta, junto con su ETag, de modo que servirla solo requiere añadir la línea de
+estado y la fecha y hacer una única escritura en el socket.
+"""
+
+from collections import namedtuple
+import hashlib
+
+CachedResponse = namedtuple("CachedResponse", ["etag", "payload"])
+
+
+def make_cached_response(body, content_type):
+    """
+    Construye una respuesta cacheable a partir del cuerpo ya serializado
+    """
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    headers = (
+        f"Content-type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"ETag: {etag}\r\n"
+        "\r\n"
+    ).encode("latin-1")
+    return CachedResponse(etag, headers + body)
+
+
+def send_cached_response(handler, cached):
+    """
+    Envía una respuesta preconstruida desde un BaseHTTPRequestHandler.
+
+    Si el cliente ya tiene esa versión (cabecera If-None-Match) responde 304 sin cuerpo.
+    """
+    if cached.etag in handler.headers.get("If-None-Match", ""):
+        handler.send_response(304)
+        handler.send_header("ETag", cached.etag)
+        handler.end_headers()
+        return
+    handler.log_request(200)
+    status_line = (
+        f"{handler.protocol_version} 200 OK\r\n"
+        f"Server: {handler.version_string()}\r\n"
+        f"Date: {handler.date_time_string()}\r\n"
+    ).encode("latin-1")
+    handler.wfile.write(status_line + cached.payload)
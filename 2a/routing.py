@@ -0,0 +1,121 @@
+"""
+Enrutador sencillo para los manejadores `BaseHTTPRequestHandler` del apartado 2a.
+
+Las rutas se declaran con la misma sintaxis que en Flask (`/product/<int:product_id>`)
+y se guardan en un árbol de segmentos (trie). Encontrar la ruta de una petición cuesta
+lo mismo tenga la aplicación 3 o 300 rutas: solo depende del número de segmentos
+de la URL.
+
+Antes de buscar la ruta se descarta la query string (`/product/1?x=1`) y la barra
+final (`/product/1/`).
+"""
+
+from collections import namedtuple
+from urllib.parse import unquote, urlsplit
+
+
+def _to_int(segment):
+    # Igual que en Flask, solo se aceptan enteros sin signo
+    if not segment.isdigit():
+        raise ValueError(segment)
+    return int(segment)
+
+
+# Conversores de parámetros: cada uno transforma el segmento o lanza ValueError
+CONVERTERS = {
+    "str": str,
+    "int": _to_int,
+    "float": float,
+}
+
+# handler: función asociada (None si la ruta existe pero no admite el método)
+# params: parámetros extraídos de la URL; allowed: métodos que admite la ruta
+Match = namedtuple("Match", ["handler", "params", "allowed"])
+
+
+def split_path(path):
+    """
+    Devuelve los segmentos de la ruta de una URL, sin query string ni barras sobrantes
+    """
+    path = urlsplit(path).path
+    return [unquote(segment) for segment in path.split("/") if segment]
+
+
+class _Node:
+    __slots__ = ("static", "params", "methods")
+
+    def __init__(self):
+        self.static = {}
+        self.params = []
+        self.methods = {}
+
+
+class Router:
+    """
+    Tabla de rutas con selección por método HTTP y parámetros tipados
+    """
+
+    def __init__(self):
+        self._root = _Node()
+
+    def add(self, pattern, handler, methods=("GET",)):
+        """
+        Registra `handler` para la ruta `pattern` y los métodos indicados
+        """
+        node = self._root
+        for segment in split_path(pattern):
+            if segment.startswith("<") and segment.endswith(">"):
+                converter_name, _, name = segment[1:-1].rpartition(":")
+                converter = CONVERTERS[converter_name or "str"]
+                for param_name, param_converter, child in node.params:
+                    if param_name == name and param_converter is converter:
+                        node = child
+                        break
+                else:
+                    child = _Node()
+                    node.params.append((name, converter, child))
+                    node = child
+            else:
+                node = node.static.setdefault(segment, _Node())
+        for method in methods:
+            node.methods[method] = handler
+
+    def route(self, pattern, methods=("GET",)):
+        """
+        Decorador equivalente a `add`
+        """
+        def decorator(handler):
+            self.add(pattern, handler, methods)
+            return handler
+        return decorator
+
+    def match(self, method, path):
+        """
+        Busca la ruta de una petición. Devuelve un `Match` o None si ninguna ruta coincide.
+        """
+        params = {}
+        node = self._find(self._root, split_path(path), 0, params)
+        if node is None:
+            return None
+        return Match(node.methods.get(method), params, tuple(node.methods))
+
+    def _find(self, node, segments, index, params):
+        if index == len(segments):
+            return node if node.methods else None
+        segment = segments[index]
+        # Los segmentos fijos tienen prioridad sobre los parámetros
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._find(child, segments, index + 1, params)
+            if found is not None:
+                return found
+        for name, converter, child in node.params:
+            try:
+                value = converter(segment)
+            except ValueError:
+                continue
+            found = self._find(child, segments, index + 1, params)
+            if found is not None:
+                params[name] = value
+                return found
+        return None
@@ -0,0 +1,328 @@
+"""
+Utilidades compartidas por los ejercicios del apartado 2a para construir servidores HTTP
+con distintos modelos de concurrencia.
+
+Modos disponibles (parámetro `mode` de `build_server`):
+- "single": `HTTPServer` clásico, atiende una petición detrás de otra.
+- "threading": `ThreadingHTTPServer`, un hilo nuevo por conexión.
+- "pool": un número acotado de hilos reutilizables (`ThreadPoolHTTPServer`).
+- "prefork": varios procesos, cada uno con su propio socket de escucha `SO_REUSEPORT`
+  y un hilo por conexión (`PreforkHTTPServer`). Solo disponible en sistemas con
+  `os.fork` y `SO_REUSEPORT`.
+
+Con `backend="asyncio"` el servidor no usa `socketserver`: `AsyncioHTTPServer` atiende
+todas las conexiones desde un único bucle de eventos y ejecuta el mismo manejador
+`BaseHTTPRequestHandler` para cada petición.
+"""
+
+from http.server import HTTPServer, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import io
+import os
+import signal
+import socket
+import threading
+
+MODES = ("single", "threading", "pool", "prefork")
+BACKENDS = ("socketserver", "asyncio")
+
+
+class ThreadPoolHTTPServer(HTTPServer):
+    """
+    Servidor HTTP que atiende las conexiones con un número fijo de hilos.
+
+    Cuando todos los hilos están ocupados y la cola de espera está llena, las conexiones
+    nuevas se rechazan con un 503 en lugar de bloquear el bucle de aceptación, que así
+    sigue respondiendo a `shutdown`.
+    """
+
+    # Respuesta a las conexiones que llegan con el pool y la cola de espera llenos
+    overload_response = (b"HTTP/1.1 503 Service Unavailable\r\n"
+                         b"Content-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n")
+
+    def __init__(self, server_address, RequestHandlerClass, workers=8, backlog=None):
+        super().__init__(server_address, RequestHandlerClass)
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http-worker")
+        # Limita las conexiones aceptadas pendientes de ser atendidas
+        self._slots = threading.BoundedSemaphore(workers + (workers if backlog is None else backlog))
+
+    def process_request(self, request, client_address):
+        """
+        Entrega la conexión a un hilo del pool en lugar de atenderla en el bucle principal
+        """
+        if not self._slots.acquire(blocking=False):
+            self._reject_request(request)
+            return
+        try:
+            self._executor.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # El pool ya se ha cerrado
+            self._slots.release()
+            self.shutdown_request(request)
+
+    def _reject_request(self, request):
+        try:
+            request.sendall(self.overload_response)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=True)
+
+
+class _ReusePortHTTPServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP con un hilo por conexión cuyo socket de escucha activa `SO_REUSEPORT`.
+    Con hilos, un cliente keep-alive inactivo no bloquea al proceso entero.
+    """
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+class PreforkHTTPServer(_ReusePortHTTPServer):
+    """
+    Servidor HTTP multiproceso.
+
+    Al llamar a `serve_forever` se crean `workers - 1` procesos hijos. Cada hijo abre su
+    propio socket de escucha en la misma dirección gracias a `SO_REUSEPORT`, de forma que
+    es el núcleo quien reparte las conexiones entre procesos. El proceso padre también
+    atiende peticiones y, al llamar a `shutdown`, termina a todos sus hijos.
+    """
+
+    def __init__(self, server_address, RequestHandlerClass, workers=None):
+        if not hasattr(os, "fork") or not hasattr(socket, "SO_REUSEPORT"):
+            raise ValueError("El modo 'prefork' requiere os.fork y SO_REUSEPORT")
+        self.workers = workers or os.cpu_count() or 1
+        self._children = []
+        super().__init__(server_address, RequestHandlerClass)
+
+    def serve_forever(self, poll_interval=0.5):
+        """
+        Crea los procesos hijos y atiende peticiones también en el proceso actual
+        """
+        for _ in range(self.workers - 1):
+            pid = os.fork()
+            if pid == 0:
+                self._run_child(poll_interval)
+            self._children.append(pid)
+        super().serve_forever(poll_interval)
+
+    def _run_child(self, poll_interval):
+        """
+        Bucle de un proceso hijo: nunca vuelve al código del padre
+        """
+        status = 0
+        try:
+            # El socket heredado se cierra; el hijo escucha en uno propio
+            self.socket.close()
+            child = _ReusePortHTTPServer(self.server_address, self.RequestHandlerClass)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            child.serve_forever(poll_interval)
+        except BaseException:
+            status = 1
+        finally:
+            os._exit(status)
+
+    def shutdown(self):
+        super().shutdown()
+        self._stop_children()
+
+    def server_close(self):
+        super().server_close()
+        self._stop_children()
+
+    def _stop_children(self):
+        for pid in self._children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children = []
+
+
+class _StreamConnection:
+    """
+    Conexión que se entrega al manejador en el backend asyncio: la petición ya se ha
+    leído en memoria y lo que escribe el manejador pasa directamente al transporte
+    """
+
+    def __init__(self, request_bytes, writer):
+        self._request_bytes = request_bytes
+        self._writer = writer
+
+    def makefile(self, mode, buffering=-1):
+        return io.BytesIO(self._request_bytes)
+
+    def sendall(self, data):
+        self._writer.write(data)
+
+    def settimeout(self, timeout):
+        pass
+
+    def setsockopt(self, *args):
+        pass
+
+
+class AsyncioHTTPServer:
+    """
+    Servidor HTTP basado en los streams de asyncio.
+
+    Ofrece la misma interfaz que `HTTPServer` (`serve_forever`, `shutdown`,
+    `server_close`, `server_name`, `server_port`), así que se puede arrancar en un
+    hilo igual que los servidores de `socketserver`. Cada conexión inactiva solo
+    ocupa una corrutina y sus buffers, por lo que un único hilo mantiene miles de
+    conexiones abiertas.
+    """
+
+    # Tamaño máximo de la línea de petición más las cabeceras y del cuerpo
+    max_header_size = 65536
+    max_body_size = 1024 * 1024
+
+    def __init__(self, server_address, RequestHandlerClass):
+        self.RequestHandlerClass = RequestHandlerClass
+        self.socket = socket.create_server(server_address)
+        self.server_address = self.socket.getsockname()[:2]
+        host, self.server_port = self.server_address
+        self.server_name = socket.getfqdn(host)
+        self._loop = None
+        self._stop = None
+        self._started = threading.Event()
+        self._stopped = threading.Event()
+        # Conexiones abiertas: writer -> tarea que la atiende
+        self._connections = {}
+
+    def serve_forever(self, poll_interval=None):
+        """
+        Atiende peticiones hasta que se llama a `shutdown` desde otro hilo.
+        `poll_interval` se acepta por compatibilidad con `HTTPServer` y no se usa.
+        """
+        self._stopped.clear()
+        try:
+            asyncio.run(self._serve())
+        finally:
+            self._stopped.set()
+
+    def shutdown(self):
+        """
+        Detiene `serve_forever` y espera a que termine
+        """
+        self._started.wait()
+        self._loop.call_soon_threadsafe(self._stop.set)
+        self._stopped.wait()
+
+    def server_close(self):
+        self.socket.close()
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(
+            self._handle_connection, sock=self.socket, limit=self.max_header_size
+        )
+        self._started.set()
+        await self._stop.wait()
+        server.close()
+        # Las conexiones keep-alive inactivas se cierran para no bloquear el apagado
+        for writer in list(self._connections):
+            writer.close()
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        await server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        client_address = writer.get_extra_info("peername")
+        try:
+            keep_alive = True
+            while keep_alive:
+                request_bytes = await self._read_request(reader)
+                if request_bytes is None:
+                    break
+                keep_alive = self._run_handler(request_bytes, client_address, writer)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        Lee una petición completa (cabeceras y cuerpo según Content-Length). Devuelve
+        None si el cliente cierra la conexión, supera el tiempo de inactividad o envía
+        una petición demasiado grande.
+        """
+        try:
+            head = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), self.RequestHandlerClass.timeout
+            )
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            return None
+        length = 0
+        for line in head.split(b"\r\n"):
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                try:
+                    length = int(value)
+                except ValueError:
+                    return None
+        if length > self.max_body_size:
+            return None
+        body = await reader.readexactly(length) if length else b""
+        return head + body
+
+    def _run_handler(self, request_bytes, client_address, writer):
+        """
+        Ejecuta el manejador para una petición y devuelve si la conexión debe seguir abierta.
+
+        Se reproduce lo que hace `BaseRequestHandler.__init__`, pero atendiendo una única
+        petición: las siguientes se leen de nuevo desde el stream.
+        """
+        handler = self.RequestHandlerClass.__new__(self.RequestHandlerClass)
+        handler.request = _StreamConnection(request_bytes, writer)
+        handler.client_address = client_address
+        handler.server = self
+        handler.close_connection = True
+        handler.setup()
+        try:
+            handler.handle_one_request()
+        finally:
+            handler.finish()
+        return not handler.close_connection
+
+
+def build_server(server_address, RequestHandlerClass, mode="single", workers=None,
+                 backend="socketserver"):
+    """
+    Crea un servidor HTTP para el manejador indicado según el modo de concurrencia.
+    Con `backend="asyncio"` el modo no se aplica: todas las conexiones se atienden
+    desde un único bucle de eventos.
+    """
+    if backend == "asyncio":
+        return AsyncioHTTPServer(server_address, RequestHandlerClass)
+    if backend != "socketserver":
+        raise ValueError(f"Backend desconocido: {backend!r} (opciones: {', '.join(BACKENDS)})")
+    if mode == "single":
+        return HTTPServer(server_address, RequestHandlerClass)
+    if mode == "threading":
+        return ThreadingHTTPServer(server_address, RequestHandlerClass)
+    if mode == "pool":
+        return ThreadPoolHTTPServer(server_address, RequestHandlerClass, workers=workers or 8)
+    if mode == "prefork":
+        return PreforkHTTPServer(server_address, RequestHandlerClass, workers=workers)
+    raise ValueError(f"Modo de servidor desconocido: {mode!r} (opciones: {', '.join(MODES)})")
@@ -22,12 +22,15 @@ Estos métodos son fundamentales para construir APIs web interactivas que puedan
 """
 
 from flask import Flask, jsonify, request
+from json_provider_2b import FastJSONProvider
 
 def create_app():
     """
     Crea y configura la aplicación Flask
     """
     app = Flask(__name__)
+    # jsonify() y request.get_json() usan el proveedor JSON de json_provider_2b.py
+    app.json = FastJSONProvider(app)
 
     @app.route('/search', methods=['GET'])
     def search():
@@ -0,0 +1,78 @@
+"""
+Benchmark de la serialización JSON de las respuestas de los endpoints Flask.
+
+Mide lo que cuesta generar el cuerpo de respuestas con la forma de las de los
+endpoints (un producto de ej2c1, el resultado de /search de ej2b3 y los listados de
+tareas de ej2c2 con 10.000 y 100.000 tareas) con el proveedor por defecto de Flask y
+con `FastJSONProvider`, con la biblioteca estándar y, si está instalado, con orjson.
+Los listados grandes se miden también con `stream_array`.
+
+Uso: python bench_json.py
+"""
+
+import argparse
+import timeit
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider_2c import FastJSONProvider, orjson
+
+PAYLOADS = {
+    "GET /product/1": {"id": 1, "name": "Laptop", "price": 999.99},
+    "GET /search": {"query": "camión", "page": 1, "results": [f"Resultado {i}" for i in range(10)]},
+    "GET /tasks (10k)": [{"id": i, "name": f"Tarea {i}"} for i in range(1, 10_001)],
+    "GET /tasks (100k)": [{"id": i, "name": f"Tarea número {i}"} for i in range(1, 100_001)],
+}
+
+
+def make_providers():
+    """
+    Devuelve (nombre, aplicación) para cada proveedor que se compara
+    """
+    default = Flask("default")
+    default.json = DefaultJSONProvider(default)
+    providers = [("Flask", default)]
+    stdlib = Flask("stdlib")
+    stdlib.json = FastJSONProvider(stdlib)
+    stdlib.json.accelerated = False
+    providers.append(("Fast (json)", stdlib))
+    if orjson is not None:
+        fast = Flask("orjson")
+        fast.json = FastJSONProvider(fast)
+        providers.append(("Fast (orjson)", fast))
+    return providers
+
+
+def measure(function, payload):
+    """
+    Devuelve el tiempo medio por respuesta en microsegundos (mejor de 3 repeticiones)
+    """
+    number = 20_000 if not isinstance(payload, list) or len(payload) < 1000 else 5
+    return min(timeit.repeat(function, repeat=3, number=number)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+
+    providers = make_providers()
+    print(f"{'respuesta':<18} " + " ".join(f"{name:>15}" for name, _ in providers) + "   (µs)")
+    for label, payload in PAYLOADS.items():
+        times = []
+        for _, app in providers:
+            with app.app_context():
+                times.append(measure(lambda: app.json.response(payload).get_data(), payload))
+        print(f"{label:<18} " + " ".join(f"{t:>15.1f}" for t in times))
+
+        if isinstance(payload, list) and len(payload) >= 1000:
+            streamed = []
+            for _, app in providers[1:]:
+                with app.app_context():
+                    streamed.append(measure(lambda: b"".join(app.json.stream_array(payload).response),
+                                            payload))
+            print(f"{'  stream_array':<18} {'-':>15} " + " ".join(f"{t:>15.1f}" for t in streamed))
+
+
+if __name__ == "__main__":
+    main()
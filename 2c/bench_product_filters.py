@@ -0,0 +1,98 @@
+"""
+Benchmark de los filtros de GET /products (ej2c3).
+
+Genera un catálogo de productos (un millón por defecto) y mide cada consulta con el
+filtrado original, que recorre la lista con una list comprehension por filtro, con
+`ProductIndex` y, si NumPy está instalado, con `ColumnarProductIndex`. Los resultados
+de todos los caminos se comparan antes de medir.
+
+Uso: python bench_product_filters.py [--size 1000000]
+"""
+
+import argparse
+import random
+import time
+import timeit
+
+from ej2c3 import ColumnarProductIndex, ProductIndex, np
+
+CATEGORIES = ["electronics", "furniture", "appliances", "accessories", "books",
+              "toys", "garden", "sports", "music", "food"]
+WORDS = ["pro", "mini", "max", "smart", "wireless", "office", "coffee", "desk", "chair", "lamp"]
+
+QUERIES = {
+    "category": {"category": "books"},
+    "price range": {"min_price": 100.0, "max_price": 101.0},
+    "category + price": {"category": "books", "min_price": 100.0, "max_price": 200.0},
+    "name": {"name": "wireless lamp"},
+    "all filters": {"category": "toys", "min_price": 10.0, "max_price": 500.0, "name": "smart"},
+}
+
+
+def make_products(size, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": i,
+            "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {i}",
+            "price": round(rng.uniform(1, 2000), 2),
+            "category": rng.choice(CATEGORIES),
+        }
+        for i in range(1, size + 1)
+    ]
+
+
+def list_filter(products, category=None, min_price=None, max_price=None, name=None):
+    """
+    Filtrado original de get_products: una pasada completa por cada filtro
+    """
+    result = products.copy()
+    if category:
+        result = [p for p in result if p["category"] == category]
+    if min_price is not None:
+        result = [p for p in result if p["price"] >= min_price]
+    if max_price is not None:
+        result = [p for p in result if p["price"] <= max_price]
+    if name:
+        result = [p for p in result if name.lower() in p["name"].lower()]
+    return result
+
+
+def measure(function, number=3):
+    """
+    Devuelve el tiempo medio por consulta en milisegundos (mejor de 3 repeticiones)
+    """
+    return min(timeit.repeat(function, repeat=3, number=number)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    products = make_products(args.size)
+    start = time.perf_counter()
+    index = ProductIndex(products)
+    print(f"{args.size} productos, índice construido en {time.perf_counter() - start:.1f} s")
+    columnar = None
+    if np is not None:
+        start = time.perf_counter()
+        columnar = ColumnarProductIndex(products)
+        print(f"Índice columnar construido en {time.perf_counter() - start:.1f} s")
+
+    print(f"{'consulta':<18} {'resultados':>10} {'lista (ms)':>11} {'índice (ms)':>12} "
+          f"{'numpy (ms)':>11}")
+    for label, query in QUERIES.items():
+        expected = list_filter(products, **query)
+        assert index.search(**query) == expected, label
+        scanned = measure(lambda: list_filter(products, **query))
+        indexed = measure(lambda: index.search(**query))
+        vectorized = "-"
+        if columnar is not None:
+            assert columnar.search(**query) == expected, label
+            vectorized = f"{measure(lambda: columnar.search(**query)):.2f}"
+        print(f"{label:<18} {len(expected):>10} {scanned:>11.2f} {indexed:>12.2f} {vectorized:>11}")
+
+
+if __name__ == "__main__":
+    main()
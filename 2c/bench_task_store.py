@@ -0,0 +1,70 @@
+"""
+Benchmark de las operaciones de la API de tareas (ej2c2) según el número de tareas.
+
+Compara la lista original, en la que actualizar o eliminar una tarea recorre la lista
+con `enumerate` y `tasks.pop(i)` desplaza el resto, con `TaskStore`, indexado por ID.
+Para cada tamaño se actualizan y eliminan tareas repartidas por todo el almacén.
+
+Uso: python bench_task_store.py [--sizes 100 10000 1000000] [--operations 100]
+"""
+
+import argparse
+import random
+import time
+
+from task_store import TaskStore
+
+
+def list_update(tasks, task_id, name):
+    for task in tasks:
+        if task["id"] == task_id:
+            task["name"] = name
+            return task
+    return None
+
+
+def list_delete(tasks, task_id):
+    for i, task in enumerate(tasks):
+        if task["id"] == task_id:
+            return tasks.pop(i)
+    return None
+
+
+def measure(function, ids):
+    """
+    Devuelve la latencia media por operación en microsegundos
+    """
+    start = time.perf_counter()
+    for task_id in ids:
+        function(task_id)
+    return (time.perf_counter() - start) / len(ids) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    parser.add_argument("--operations", type=int, default=100, help="operaciones por medida")
+    args = parser.parse_args()
+
+    print(f"{'tareas':>8} {'operación':<10} {'lista (µs)':>11} {'TaskStore (µs)':>15}")
+    for size in args.sizes:
+        tasks = [{"id": i, "name": f"Tarea {i}"} for i in range(1, size + 1)]
+        store = TaskStore()
+        for i in range(1, size + 1):
+            store.add(f"Tarea {i}")
+        ids = random.sample(range(1, size + 1), min(args.operations, size))
+
+        results = {
+            "update": (measure(lambda task_id: list_update(tasks, task_id, "x"), ids),
+                       measure(lambda task_id: store.update(task_id, "x"), ids)),
+            "get": (measure(lambda task_id: next(t for t in tasks if t["id"] == task_id), ids),
+                    measure(store.get, ids)),
+            "delete": (measure(lambda task_id: list_delete(tasks, task_id), ids),
+                       measure(store.delete, ids)),
+        }
+        for operation, (listed, indexed) in results.items():
+            print(f"{size:>8} {operation:<10} {listed:>11.2f} {indexed:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
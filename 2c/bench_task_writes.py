@@ -0,0 +1,63 @@
+"""
+Prueba de carga de las escrituras en SQLiteTaskStore, con y sin group commit.
+
+Varios hilos crean tareas a la vez durante unos segundos sobre una base de datos nueva
+en un directorio temporal, y se muestran las escrituras confirmadas por segundo. Se
+mide con `synchronous=NORMAL` (el valor por defecto) y `FULL`, que sincroniza el disco
+en cada COMMIT y es donde agrupar transacciones ahorra más.
+
+Uso: python bench_task_writes.py [--duration 3] [--threads 1 8 32]
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from task_store import SQLiteTaskStore
+
+
+def run(path, group_commit, synchronous, threads, duration):
+    """
+    Devuelve las escrituras por segundo con `threads` hilos escribiendo a la vez
+    """
+    store = SQLiteTaskStore(path, group_commit=group_commit, synchronous=synchronous)
+    counts = [0] * threads
+    deadline = time.monotonic() + duration
+
+    def writer(index):
+        while time.monotonic() < deadline:
+            store.add(f"Tarea {index}")
+            counts[index] += 1
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return sum(counts) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3, help="segundos de carga por medida")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    args = parser.parse_args()
+
+    print(f"{'synchronous':<12} {'hilos':>5} {'sin group commit':>17} {'con group commit':>17}")
+    with tempfile.TemporaryDirectory() as directory:
+        for synchronous in ("NORMAL", "FULL"):
+            for threads in args.threads:
+                rates = []
+                for group_commit in (False, True):
+                    path = os.path.join(directory, f"{synchronous}-{threads}-{group_commit}.sqlite3")
+                    rates.append(run(path, group_commit, synchronous, threads, args.duration))
+                print(f"{synchronous:<12} {threads:>5} {rates[0]:>15.0f}/s {rates[1]:>15.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
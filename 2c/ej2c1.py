@@ -28,7 +28,8 @@ Ejemplo:
 2. Una solicitud `GET /product/999` debe devolver un mensaje de error con código 404.
 """
 
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
+from json_provider_2c import FastJSONProvider
 
 # Lista de productos predefinida
 products = [
@@ -37,11 +38,19 @@ products = [
     {"id": 3, "name": "Tablet", "price": 349.99}
 ]
 
+# Número máximo de IDs que se pueden pedir en una sola petición por lotes
+MAX_BATCH_IDS = 1000
+
 def create_app():
     """
     Crea y configura la aplicación Flask
     """
     app = Flask(__name__)
+    # jsonify() y request.get_json() usan el proveedor JSON de json_provider_2c.py
+    app.json = FastJSONProvider(app)
+
+    # Índice de productos por ID: cada búsqueda cuesta O(1) en lugar de recorrer la lista
+    product_index = {product["id"]: product for product in products}
 
     @app.route('/product/<int:product_id>', methods=['GET'])
     def get_product(product_id):
@@ -51,11 +60,51 @@ def create_app():
         - Si no existe: devuelve un error con código 404 (Not Found)
         """
         # Implementa este endpoint
-        for product in products:
-            if product["id"] == product_id:
-                return jsonify(product), 200
+        product = product_index.get(product_id)
+        if product is not None:
+            return jsonify(product), 200
         return jsonify({"error": "Product not found"}), 404
 
+    def batch_get(ids):
+        """
+        Resuelve una lista de IDs contra el índice en una sola pasada.
+        Devuelve los productos encontrados (en el orden pedido y sin repetidos)
+        y, por separado, los IDs que no existen.
+        """
+        if len(ids) > MAX_BATCH_IDS:
+            return jsonify({"error": f"Too many ids (max {MAX_BATCH_IDS})"}), 400
+        found = []
+        missing = []
+        for product_id in dict.fromkeys(ids):
+            product = product_index.get(product_id)
+            if product is None:
+                missing.append(product_id)
+            else:
+                found.append(product)
+        return jsonify({"products": found, "missing": missing}), 200
+
+    @app.route('/products', methods=['GET'])
+    def get_products():
+        """
+        Devuelve varios productos a la vez: GET /products?ids=1,2,3
+        """
+        try:
+            ids = [int(value) for value in request.args.get('ids', '').split(',') if value]
+        except ValueError:
+            return jsonify({"error": "ids must be a comma-separated list of integers"}), 400
+        return batch_get(ids)
+
+    @app.route('/products:batchGet', methods=['POST'])
+    def batch_get_products():
+        """
+        Devuelve varios productos a la vez a partir de un JSON {"ids": [1, 2, 3]}
+        """
+        data = request.get_json(silent=True)
+        ids = data.get("ids") if isinstance(data, dict) else None
+        if not isinstance(ids, list) or not all(type(value) is int for value in ids):
+            return jsonify({"error": "Missing or invalid 'ids' field"}), 400
+        return batch_get(ids)
+
 
     return app
 
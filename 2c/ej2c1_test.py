@@ -1,6 +1,8 @@
 import pytest
 from flask.testing import FlaskClient
 from ej2c1 import create_app
+import json_provider_2c
+from datetime import datetime, timezone
 
 @pytest.fixture
 def client() -> FlaskClient:
@@ -26,3 +28,43 @@ def test_get_product_not_found(client):
     response = client.get("/product/999")
     assert response.status_code == 404
     assert "error" in response.json
+
+def test_get_products_batch(client):
+    """Test GET /products?ids=... (several products in one request, missing ids reported apart)"""
+    response = client.get("/products?ids=3,999,1,3")
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json["products"]] == [3, 1]
+    assert response.json["missing"] == [999]
+
+    response = client.get("/products?ids=1,abc")
+    assert response.status_code == 400
+
+def test_post_products_batch_get(client):
+    """Test POST /products:batchGet with a JSON list of ids"""
+    response = client.post("/products:batchGet", json={"ids": [2, 4]})
+    assert response.status_code == 200
+    assert response.json == {"products": [{"id": 2, "name": "Smartphone", "price": 699.99}], "missing": [4]}
+
+    response = client.post("/products:batchGet", json={"ids": "1,2"})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize("accelerated", [False, True])
+def test_json_provider(accelerated):
+    """Test FastJSONProvider output with and without the optional orjson encoder"""
+    if accelerated and json_provider_2c.orjson is None:
+        pytest.skip("orjson is not installed")
+    app = create_app()
+    app.json.accelerated = accelerated
+    with app.app_context():
+        response = app.json.response({"b": "Camión", "a": [1, 2.5, None], "when": datetime(2024, 1, 2, tzinfo=timezone.utc)})
+        assert response.get_data() == (
+            '{"a":[1,2.5,null],"b":"Camión","when":"Tue, 02 Jan 2024 00:00:00 GMT"}\n'.encode()
+        )
+        # Non-string keys and integers beyond 64 bits fall back to the json module
+        assert app.json.dumps({1: 2 ** 70}) == '{"1":1180591620717411303424}'
+        assert app.json.loads('{"id": 1, "name": "Camión"}'.encode()) == {"id": 1, "name": "Camión"}
+        with pytest.raises(ValueError):
+            app.json.loads("{")
+
+        app.json.ensure_ascii = True
+        assert app.json.dumps({"name": "Camión"}) == '{"name":"Cami\\u00f3n"}'
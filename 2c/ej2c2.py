@@ -27,26 +27,249 @@ Si la lista de tareas inicial está vacía:
 Tu tarea es implementar esta API en Flask.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
+import hashlib
+import json
+import os
+from task_store import TaskStore, SQLiteTaskStore, ChangesExpired
+from json_provider_2c import FastJSONProvider
+from pagination import MAX_PAGE_SIZE, paginate
 
-# Esta lista almacenará todas las tareas
-tasks = []
-# Este contador se usará para asignar IDs únicos
-next_id = 1
+# Este almacén guardará todas las tareas y asignará IDs únicos
+tasks = TaskStore()
 
-def create_app():
+# Número máximo de tareas del listado completo que se guarda serializado en la caché;
+# con más tareas, el listado se envía por fragmentos sin guardarlo
+MAX_CACHED_LISTING = 10000
+# Número de operaciones de POST /tasks:bulk que se aplican juntas en cada lote
+BULK_BATCH_SIZE = 500
+# Espera por defecto y máxima (en segundos) de GET /tasks/changes en modo long-poll
+CHANGES_TIMEOUT = 30
+MAX_CHANGES_TIMEOUT = 60
+# Cada cuántos segundos se envía un comentario a las conexiones SSE sin cambios, para
+# que los proxies no las den por muertas
+SSE_KEEPALIVE = 15
+
+def parse_non_negative_int(value, name):
+    """
+    Convierte un parámetro en un entero no negativo. Lanza ValueError si no lo es.
+    """
+    if not value.isdigit():
+        raise ValueError(f"{name} must be a non-negative integer")
+    return int(value)
+
+def format_sse(events, dumps=json.dumps):
+    """
+    Da formato de Server-Sent Events a una lista de cambios: el número de secuencia va en
+    "id", que el navegador reenvía en Last-Event-ID al reconectarse
+    """
+    return "".join(f"id: {event['seq']}\nevent: {event['op']}\ndata: {dumps(event)}\n\n"
+                   for event in events)
+
+def iter_sse(changes, since, dumps=json.dumps):
+    """
+    Genera el flujo SSE de cambios posteriores a `since` mientras el cliente siga conectado.
+    Si el cliente se ha quedado atrás y faltan cambios, envía un evento "reset" y termina.
+    """
+    while True:
+        try:
+            events = changes.since(since, timeout=SSE_KEEPALIVE, limit=MAX_PAGE_SIZE)
+        except ChangesExpired:
+            yield f"event: reset\ndata: {json.dumps({'last_seq': changes.last_seq})}\n\n"
+            return
+        if not events:
+            yield ": keep-alive\n\n"
+            continue
+        yield format_sse(events, dumps)
+        since = events[-1]["seq"]
+
+def parse_bulk_operation(item):
+    """
+    Valida una operación de POST /tasks:bulk y la convierte en (op, task_id, name).
+    Lanza ValueError con el motivo si no es válida.
+    """
+    if not isinstance(item, dict):
+        raise ValueError("Operation must be a JSON object")
+    op = item.get("op", "create")
+    if op not in ("create", "update", "delete"):
+        raise ValueError(f"Unknown op: {op!r}")
+    task_id = item.get("id")
+    if op != "create" and type(task_id) is not int:
+        raise ValueError("Missing or invalid 'id' field")
+    name = item.get("name")
+    if op != "delete":
+        if name is None:
+            raise ValueError("Missing 'name' field")
+        if not isinstance(name, str):
+            raise ValueError("'name' must be a string")
+    return op, task_id, name
+
+def bulk_result(op, result):
+    """
+    Convierte el resultado de una operación en el objeto que devolvería su endpoint individual
+    """
+    if op == "create":
+        return {"status": 201, "task": result}
+    if op == "update" and result is not None:
+        return {"status": 200, "task": result}
+    if op == "delete" and result:
+        return {"status": 200, "message": "Task deleted"}
+    return {"status": 404, "error": "Task not found"}
+
+def iter_bulk_results(store, items):
+    """
+    Aplica las operaciones en lotes de BULK_BATCH_SIZE y genera el resultado de cada una,
+    en el mismo orden y con su posición ("index") en la petición
+    """
+    def flush(batch):
+        valid = [(index, operation) for index, operation in batch if not isinstance(operation, str)]
+        results = iter(store.apply_batch([operation for _, operation in valid]))
+        for index, operation in batch:
+            if isinstance(operation, str):
+                yield {"index": index, "status": 400, "error": operation}
+            else:
+                yield {"index": index, **bulk_result(operation[0], next(results))}
+
+    batch = []
+    for index, item in enumerate(items):
+        try:
+            batch.append((index, parse_bulk_operation(item)))
+        except ValueError as e:
+            batch.append((index, str(e)))
+        if len(batch) >= BULK_BATCH_SIZE:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+def create_app(config=None):
     """
     Crea y configura la aplicación Flask
+
+    Opciones de configuración del almacenamiento de tareas:
+    - TASKS_STORAGE: "memory" (por defecto, el almacén en memoria del módulo) o "sqlite"
+    - TASKS_DATABASE: ruta del fichero SQLite (por defecto, tasks.sqlite3 en la carpeta instance)
+    - TASKS_GROUP_COMMIT: agrupa las escrituras concurrentes en una sola transacción
+    - TASKS_SYNCHRONOUS: modo PRAGMA synchronous de SQLite ("NORMAL" por defecto o "FULL")
     """
     app = Flask(__name__)
+    # jsonify() y request.get_json() usan el proveedor JSON de json_provider_2c.py
+    app.json = FastJSONProvider(app)
+    app.config.update(TASKS_STORAGE="memory", TASKS_DATABASE=None, TASKS_GROUP_COMMIT=False,
+                      TASKS_SYNCHRONOUS="NORMAL")
+    if config:
+        app.config.update(config)
+
+    if app.config["TASKS_STORAGE"] == "sqlite":
+        database = app.config["TASKS_DATABASE"]
+        if database is None:
+            os.makedirs(app.instance_path, exist_ok=True)
+            database = os.path.join(app.instance_path, "tasks.sqlite3")
+        store = SQLiteTaskStore(
+            database,
+            group_commit=app.config["TASKS_GROUP_COMMIT"],
+            synchronous=app.config["TASKS_SYNCHRONOUS"],
+        )
+    elif app.config["TASKS_STORAGE"] == "memory":
+        store = tasks
+    else:
+        raise ValueError(f"Unknown TASKS_STORAGE: {app.config['TASKS_STORAGE']!r}")
+    app.extensions["tasks_store"] = store
+
+    # Última página serializada: ((versión, query string), cuerpo, cursor siguiente).
+    # Se sustituye entero de una vez para que los hilos nunca lean una mezcla de dos páginas.
+    listing_cache = [(None, None, None)]
 
     @app.route('/tasks', methods=['GET'])
     def get_tasks():
         """
-        Devuelve la lista completa de tareas
+        Devuelve la lista completa de tareas.
+        Admite paginación (limit, cursor) y proyección de campos (fields).
+
+        El listado completo y las páginas con `limit` se guardan serializados en una
+        caché. El resto de listados sin `limit` (con cursor o fields, o el completo de un
+        almacén de más de MAX_CACHED_LISTING tareas) se envían por fragmentos a medida que
+        se serializan.
+
+        La respuesta lleva un ETag derivado de la versión del almacén. Si el cliente
+        envía ese ETag en If-None-Match y nada ha cambiado, se responde 304 sin volver
+        a serializar la lista.
         """
         # Implementa este endpoint
-        return jsonify(tasks)
+        # La versión se lee antes que los datos: así un ETag nunca describe datos más antiguos
+        version = store.version
+        key = (version, request.query_string)
+        etag = f"tasks-{version}"
+        if request.query_string:
+            etag += "-" + hashlib.sha1(request.query_string).hexdigest()[:16]
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        cached_key, body, next_cursor = listing_cache[0]
+        if cached_key != key and not request.args.get('limit') and (
+                request.query_string or len(store) > MAX_CACHED_LISTING):
+            # Listado sin límite que no se guarda: se envía por fragmentos
+            try:
+                page, _ = paginate(store, request.args)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            response = app.json.stream_array(page)
+            response.set_etag(etag)
+            return response
+
+        if cached_key != key:
+            try:
+                page, next_cursor = paginate(store, request.args)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            body = jsonify(list(page)).get_data()
+            listing_cache[0] = (key, body, next_cursor)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
+
+    @app.route('/tasks/changes', methods=['GET'])
+    def get_task_changes():
+        """
+        Devuelve los cambios (create, update, delete) posteriores al número de secuencia
+        `since`, o los que se produzcan a partir de ahora si no se indica.
+
+        - Con `Accept: text/event-stream` la respuesta es un flujo Server-Sent Events que
+          no termina; el cliente puede reanudarlo con la cabecera Last-Event-ID.
+        - Si no, es una petición long-poll: devuelve en JSON los cambios pendientes o, si no
+          hay ninguno, espera hasta `timeout` segundos a que llegue alguno. La respuesta
+          incluye `last_seq`, el valor de `since` para la petición siguiente.
+
+        Si los cambios pedidos ya no están en el búfer, responde 410 (long-poll) o envía un
+        evento "reset" (SSE): el cliente debe volver a leer GET /tasks.
+        Cada conexión abierta ocupa un hilo del servidor mientras espera.
+        """
+        changes = store.changes
+        sse = request.accept_mimetypes.best == 'text/event-stream'
+        try:
+            since = request.args.get('since') or (request.headers.get('Last-Event-ID') if sse else None)
+            since = changes.last_seq if since is None else parse_non_negative_int(since, "since")
+            timeout = parse_non_negative_int(request.args.get('timeout', str(CHANGES_TIMEOUT)), "timeout")
+            limit = parse_non_negative_int(request.args.get('limit', str(MAX_PAGE_SIZE)), "limit")
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if sse:
+            response = Response(iter_sse(changes, since, app.json.dumps), mimetype='text/event-stream')
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        try:
+            events = changes.since(since, timeout=min(timeout, MAX_CHANGES_TIMEOUT),
+                                   limit=min(limit, MAX_PAGE_SIZE) or MAX_PAGE_SIZE)
+        except ChangesExpired:
+            return jsonify({"error": "Changes no longer available", "last_seq": changes.last_seq}), 410
+        last_seq = events[-1]["seq"] if events else since
+        return jsonify({"changes": events, "last_seq": last_seq}), 200
 
     @app.route('/tasks', methods=['POST'])
     def add_task():
@@ -55,27 +278,64 @@ def create_app():
         El cuerpo de la solicitud debe incluir un JSON con el campo "name"
         """
         # Implementa este endpoint
-        global next_id
         data = request.get_json()
-        if not data or "name" not in data:
+        if not isinstance(data, dict) or "name" not in data:
             return jsonify({"error": "Missing 'name' field"}), 400
+        # Se valida el tipo para que los dos almacenes respondan igual
+        if not isinstance(data["name"], str):
+            return jsonify({"error": "'name' must be a string"}), 400
         
-        new_task = {"id": next_id, "name": data["name"]}
-        tasks.append(new_task)
-        next_id += 1
+        new_task = store.add(data["name"])
         return jsonify(new_task), 201
 
+    @app.route('/tasks:bulk', methods=['POST'])
+    def bulk_tasks():
+        """
+        Aplica muchas operaciones en una sola petición. El cuerpo puede ser un array JSON
+        o NDJSON (Content-Type application/x-ndjson, una operación por línea):
+            {"op": "create", "name": "..."}
+            {"op": "update", "id": 1, "name": "..."}
+            {"op": "delete", "id": 1}
+        La respuesta se envía a medida que se aplican los lotes, con un resultado por
+        operación y en el mismo formato que el cuerpo de la petición.
+        """
+        ndjson = request.mimetype in ('application/x-ndjson', 'application/jsonl')
+        if ndjson:
+            def items():
+                # Se lee el cuerpo línea a línea, sin cargarlo entero en memoria
+                for line in request.stream:
+                    if line.strip():
+                        try:
+                            yield json.loads(line)
+                        except ValueError:
+                            yield None
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, list):
+                return jsonify({"error": "Body must be a JSON array of operations"}), 400
+            items = lambda: iter(data)
+
+        def generate():
+            if ndjson:
+                for result in iter_bulk_results(store, items()):
+                    yield app.json.dumps(result) + "\n"
+                return
+            yield "["
+            for i, result in enumerate(iter_bulk_results(store, items())):
+                yield ("," if i else "") + app.json.dumps(result)
+            yield "]"
+
+        mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+        return Response(stream_with_context(generate()), mimetype=mimetype)
+
     @app.route('/tasks/<int:task_id>', methods=['DELETE'])
     def delete_task(task_id):
         """
         Elimina una tarea específica por su ID
         """
         # Implementa este endpoint
-        global tasks
-        for i, task in enumerate(tasks):
-            if task["id"] == task_id:
-                tasks.pop(i)
-                return jsonify({"message": "Task deleted"}), 200
+        if store.delete(task_id):
+            return jsonify({"message": "Task deleted"}), 200
         return jsonify({"error": "Task not found"}), 404
 
     @app.route('/tasks/<int:task_id>', methods=['PUT'])
@@ -87,13 +347,15 @@ def create_app():
         """
         # Implementa este endpoint
         data = request.get_json()
-        if not data or "name" not in data:
+        if not isinstance(data, dict) or "name" not in data:
             return jsonify({"error": "Missing 'name' field"}), 400
+        # Se valida el tipo para que los dos almacenes respondan igual
+        if not isinstance(data["name"], str):
+            return jsonify({"error": "'name' must be a string"}), 400
         
-        for task in tasks:
-            if task["id"] == task_id:
-                task["name"] = data["name"]
-                return jsonify(task), 200
+        task = store.update(task_id, data["name"])
+        if task is not None:
+            return jsonify(task), 200
         return jsonify({"error": "Task not found"}), 404
 
     return app
@@ -1,7 +1,12 @@
 import pytest
 from flask import Flask
 from flask.testing import FlaskClient
+import ej2c2
 from ej2c2 import create_app
+from task_store import TaskStore, SQLiteTaskStore, CounterIdAllocator, ChangeFeed, ChangesExpired
+from concurrent.futures import ThreadPoolExecutor
+import json
+import sqlite3
 
 @pytest.fixture
 def client() -> FlaskClient:
@@ -62,3 +67,249 @@ def test_update_nonexistent_task(client):
     response = client.put("/tasks/999", json={"name": "Tarea inexistente"})
     assert response.status_code == 404
     assert response.json == {"error": "Task not found"}
+
+def test_get_tasks_paginated(client):
+    """Test GET /tasks with limit, cursor and fields"""
+    expected = [task["id"] for task in client.get("/tasks").json]
+    for i in range(5):
+        expected.append(client.post("/tasks", json={"name": f"Tarea {i}"}).json["id"])
+
+    seen = []
+    url = "/tasks?limit=2&fields=id"
+    while True:
+        response = client.get(url)
+        assert response.status_code == 200
+        assert all(list(task) == ["id"] for task in response.json)
+        seen.extend(task["id"] for task in response.json)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        url = f"/tasks?limit=2&fields=id&cursor={cursor}"
+    assert seen == expected
+
+def test_task_store():
+    """Test TaskStore keeps insertion order and supports O(1) update and delete"""
+    store = TaskStore()
+    for i in range(1000):
+        store.add(f"Tarea {i}")
+    assert store.delete(500)
+    assert not store.delete(500)
+    assert store.update(501, "Cambiada") == {"id": 501, "name": "Cambiada"}
+    assert store.update(500, "No existe") is None
+    ids = [task["id"] for task in store]
+    assert len(store) == 999
+    assert ids == sorted(ids) and 500 not in ids
+    assert [task["id"] for task in store.iter_after(497)] == [498, 499] + ids[499:]
+    assert store.add("Nueva")["id"] == 1001
+    assert list(store.iter_after(1001)) == []
+
+def test_id_allocator_unique_across_threads():
+    """Test that concurrent allocation never hands out the same id twice"""
+    counter = CounterIdAllocator()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(lambda _: counter.next_id(), range(2000)))
+    assert sorted(ids) == list(range(1, 2001))
+
+def test_task_store_keeps_id_order_across_threads():
+    """Test that tasks created concurrently are stored in id order"""
+    store = TaskStore()
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: store.add(f"Tarea {i}"), range(2000)))
+    assert [task["id"] for task in store] == list(range(1, 2001))
+
+def test_sqlite_group_commit_survives_failed_transaction(tmp_path):
+    """Test that a batch whose transaction fails errors out and the writer keeps working"""
+    path = str(tmp_path / "tasks.sqlite3")
+    store = SQLiteTaskStore(path, group_commit=True, timeout=0.1)
+    other = sqlite3.connect(path, isolation_level=None)
+    try:
+        # Otro proceso tiene la base de datos bloqueada para escritura
+        other.execute("BEGIN IMMEDIATE")
+        with pytest.raises(sqlite3.OperationalError):
+            store.add("Bloqueada")
+        other.execute("ROLLBACK")
+        assert store.add("Nueva") == {"id": 1, "name": "Nueva"}
+        assert len(store) == 1
+    finally:
+        other.close()
+        store.close()
+
+@pytest.mark.parametrize("group_commit", [False, True])
+def test_sqlite_storage(tmp_path, group_commit):
+    """Test the tasks API on the SQLite backend, with and without group commit"""
+    config = {
+        "TASKS_STORAGE": "sqlite",
+        "TASKS_DATABASE": str(tmp_path / "tasks.sqlite3"),
+        "TASKS_GROUP_COMMIT": group_commit,
+    }
+    app = create_app(config)
+    client = app.test_client()
+    assert client.get("/tasks").json == []
+    assert client.post("/tasks", json={"name": "Comprar leche"}).json == {"id": 1, "name": "Comprar leche"}
+    assert client.put("/tasks/1", json={"name": "Comprar pan"}).status_code == 200
+    assert client.put("/tasks/9", json={"name": "No existe"}).status_code == 404
+
+    # Concurrent writers share one SQLite file
+    store = app.extensions["tasks_store"]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        created = list(pool.map(lambda i: store.add(f"Tarea {i}"), range(200)))
+    assert len({task["id"] for task in created}) == 200
+    store.close()
+
+    # The data survives a restart
+    app = create_app(config)
+    client = app.test_client()
+    tasks = client.get("/tasks").json
+    assert len(tasks) == 201
+    assert tasks[0] == {"id": 1, "name": "Comprar pan"}
+    store = app.extensions["tasks_store"]
+    assert [task["id"] for task in store.iter_after(199)] == [200, 201]
+    assert client.delete("/tasks/1").status_code == 200
+    assert client.delete("/tasks/1").status_code == 404
+    app.extensions["tasks_store"].close()
+
+@pytest.mark.parametrize("storage", ["memory", "sqlite"])
+def test_task_name_must_be_string(tmp_path, storage):
+    """Test that both storage backends reject a non-string name with 400"""
+    app = create_app({"TASKS_STORAGE": storage, "TASKS_DATABASE": str(tmp_path / "tasks.sqlite3")})
+    client = app.test_client()
+    task_id = client.post("/tasks", json={"name": "Tarea"}).json["id"]
+    count = len(client.get("/tasks").json)
+    for name in ({"a": 1}, ["a"], 42, None):
+        response = client.post("/tasks", json={"name": name})
+        assert response.status_code == 400
+        assert response.json == {"error": "'name' must be a string"}
+        assert client.put(f"/tasks/{task_id}", json={"name": name}).status_code == 400
+    assert client.post("/tasks", json=["name"]).status_code == 400
+    assert len(client.get("/tasks").json) == count
+    assert app.extensions["tasks_store"].get(task_id) == {"id": task_id, "name": "Tarea"}
+    if storage == "sqlite":
+        app.extensions["tasks_store"].close()
+
+def test_bulk_tasks_json(client):
+    """Test POST /tasks:bulk with a JSON array of operations"""
+    created = client.post("/tasks", json={"name": "Existente"}).json
+    operations = [
+        {"op": "create", "name": "Nueva 1"},
+        {"op": "update", "id": created["id"], "name": "Renombrada"},
+        {"op": "delete", "id": 999},
+        {"op": "create"},
+        {"op": "delete", "id": created["id"]},
+    ]
+    response = client.post("/tasks:bulk", json=operations)
+    assert response.status_code == 200
+    results = response.json
+    assert [r["status"] for r in results] == [201, 200, 404, 400, 200]
+    assert [r["index"] for r in results] == [0, 1, 2, 3, 4]
+    assert results[0]["task"]["name"] == "Nueva 1"
+    assert results[1]["task"] == {"id": created["id"], "name": "Renombrada"}
+
+    assert client.post("/tasks:bulk", json={"op": "create"}).status_code == 400
+
+def test_bulk_tasks_ndjson(tmp_path):
+    """Test POST /tasks:bulk with NDJSON on the SQLite backend"""
+    app = create_app({"TASKS_STORAGE": "sqlite", "TASKS_DATABASE": str(tmp_path / "tasks.sqlite3")})
+    client = app.test_client()
+    body = "".join(json.dumps({"op": "create", "name": f"Tarea {i}"}) + "\n" for i in range(1200))
+    # A name that SQLite cannot bind only fails its own operation, not the whole batch
+    body += json.dumps({"op": "create", "name": {"a": 1}}) + "\n"
+    body += json.dumps({"op": "create", "name": ["a"]}) + "\n"
+    body += "no es json\n"
+    response = client.post("/tasks:bulk", data=body, content_type="application/x-ndjson")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    results = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert len(results) == 1203
+    assert all(r["status"] == 201 for r in results[:1200])
+    assert [r["status"] for r in results[1200:]] == [400, 400, 400]
+    assert results[1200]["error"] == "'name' must be a string"
+    assert len(client.get("/tasks").json) == 1200
+    app.extensions["tasks_store"].close()
+
+def test_get_tasks_conditional(client):
+    """Test GET /tasks returns an ETag and answers If-None-Match with 304 until the tasks change"""
+    response = client.get("/tasks")
+    etag = response.headers["ETag"]
+
+    response = client.get("/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    # Different query parameters produce a different ETag
+    assert client.get("/tasks?fields=id").headers["ETag"] != etag
+
+    client.post("/tasks", json={"name": "Cambio"})
+    response = client.get("/tasks", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json[-1]["name"] == "Cambio"
+
+def test_get_tasks_listing_cached(client, monkeypatch):
+    """Test the full GET /tasks listing is served from the cache and only streamed when too large"""
+    client.post("/tasks", json={"name": "En caché"})
+    response = client.get("/tasks")
+    assert response.headers["Content-Length"] == str(len(response.data))
+
+    # Mientras nada cambia, el listado sale de la caché sin volver a recorrer el almacén
+    def fail(*args):
+        raise AssertionError("listing serialized again")
+    monkeypatch.setattr(ej2c2, "paginate", fail)
+    assert client.get("/tasks").data == response.data
+    monkeypatch.undo()
+
+    # Un almacén demasiado grande para la caché se envía por fragmentos
+    monkeypatch.setattr(ej2c2, "MAX_CACHED_LISTING", 0)
+    client.post("/tasks", json={"name": "Por fragmentos"})
+    response = client.get("/tasks")
+    assert "Content-Length" not in response.headers
+    assert response.json[-1]["name"] == "Por fragmentos"
+
+def test_change_feed():
+    """Test ChangeFeed returns the changes after a sequence number and drops the oldest ones"""
+    feed = ChangeFeed(maxlen=3)
+    for i in range(5):
+        feed.publish("create", i, {"id": i, "name": f"Tarea {i}"})
+    assert [event["seq"] for event in feed.since(3)] == [4, 5]
+    assert feed.since(5, timeout=0.01) == []
+    assert feed.since(2, limit=1) == [{"seq": 3, "op": "create", "id": 2, "task": {"id": 2, "name": "Tarea 2"}}]
+    with pytest.raises(ChangesExpired):
+        feed.since(1)
+    with pytest.raises(ChangesExpired):
+        feed.since(6)
+
+def test_get_task_changes_long_poll(client):
+    """Test GET /tasks/changes returns create, update and delete events after a sequence number"""
+    since = client.get("/tasks/changes?timeout=0").json["last_seq"]
+    task_id = client.post("/tasks", json={"name": "Original"}).json["id"]
+    client.put(f"/tasks/{task_id}", json={"name": "Cambiada"})
+    client.delete(f"/tasks/{task_id}")
+
+    response = client.get(f"/tasks/changes?since={since}")
+    assert response.status_code == 200
+    changes = response.json["changes"]
+    assert [(c["op"], c["id"]) for c in changes] == [("create", task_id), ("update", task_id), ("delete", task_id)]
+    assert changes[1]["task"] == {"id": task_id, "name": "Cambiada"}
+    assert response.json["last_seq"] == changes[-1]["seq"]
+
+    # Nothing new: the request waits for the timeout and returns an empty batch
+    response = client.get(f"/tasks/changes?since={response.json['last_seq']}&timeout=0")
+    assert response.json["changes"] == []
+
+    assert client.get("/tasks/changes?since=abc").status_code == 400
+    assert client.get(f"/tasks/changes?since={since + 10**6}").status_code == 410
+
+def test_get_task_changes_sse(tmp_path):
+    """Test GET /tasks/changes as a Server-Sent Events stream on the SQLite backend"""
+    app = create_app({"TASKS_STORAGE": "sqlite", "TASKS_DATABASE": str(tmp_path / "tasks.sqlite3")})
+    client = app.test_client()
+    operations = [{"op": "create", "name": "Uno"}, {"op": "create", "name": "Dos"}]
+    assert len(client.post("/tasks:bulk", json=operations).json) == 2
+
+    response = client.get("/tasks/changes?since=0", headers={"Accept": "text/event-stream"}, buffered=False)
+    assert response.mimetype == "text/event-stream"
+    chunk = next(response.response).decode()
+    response.close()
+    events = [block.splitlines() for block in chunk.strip().split("\n\n")]
+    assert [lines[:2] for lines in events] == [["id: 1", "event: create"], ["id: 2", "event: create"]]
+    assert json.loads(events[1][2][len("data: "):])["task"] == {"id": 2, "name": "Dos"}
+    app.extensions["tasks_store"].close()
@@ -31,6 +31,15 @@ Ejemplos:
 """
 
 from flask import Flask, jsonify, request
+from bisect import bisect_left, bisect_right
+from json_provider_2c import FastJSONProvider
+from pagination import paginate
+
+# NumPy es opcional: solo se necesita para el índice columnar
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Lista de productos predefinida con categorías
 products = [
@@ -44,11 +53,148 @@ products = [
     {"id": 8, "name": "Smart Watch", "price": 199.99, "category": "accessories"}
 ]
 
-def create_app():
+class ProductIndex:
     """
-    Crea y configura la aplicación Flask
+    Índices sobre la lista de productos para resolver los filtros de GET /products
+    sin recorrer todo el catálogo:
+    - category: diccionario categoría -> posiciones de sus productos
+    - price: posiciones ordenadas por precio, para buscar rangos con bisect
+    - name: nombres ya pasados a minúsculas y un índice de trigramas para las
+      búsquedas parciales
+
+    Cada filtro produce un conjunto de candidatos; se parte del más pequeño y el
+    resto de condiciones se comprueban solo sobre esos candidatos.
+    """
+
+    def __init__(self, products):
+        self.products = products
+        self.by_category = {}
+        for position, product in enumerate(products):
+            self.by_category.setdefault(product["category"], []).append(position)
+        by_price = sorted(range(len(products)), key=lambda position: products[position]["price"])
+        self.price_positions = by_price
+        self.prices = [products[position]["price"] for position in by_price]
+        self.names = [product["name"].lower() for product in products]
+        self.trigrams = {}
+        for position, name in enumerate(self.names):
+            for trigram in {name[i:i + 3] for i in range(len(name) - 2)}:
+                self.trigrams.setdefault(trigram, set()).add(position)
+
+    def _price_range(self, min_price, max_price):
+        start = 0 if min_price is None else bisect_left(self.prices, min_price)
+        end = len(self.prices) if max_price is None else bisect_right(self.prices, max_price)
+        return self.price_positions[start:end]
+
+    def _name_candidates(self, name):
+        if len(name) < 3:
+            return None
+        candidates = None
+        for trigram in {name[i:i + 3] for i in range(len(name) - 2)}:
+            positions = self.trigrams.get(trigram, set())
+            candidates = positions if candidates is None else candidates & positions
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, category=None, min_price=None, max_price=None, name=None):
+        """
+        Devuelve los productos que cumplen todos los filtros indicados,
+        en el mismo orden que la lista original
+        """
+        name = name.lower() if name else None
+        candidate_sets = []
+        if category:
+            candidate_sets.append(self.by_category.get(category, []))
+        if min_price is not None or max_price is not None:
+            candidate_sets.append(self._price_range(min_price, max_price))
+        if name:
+            name_candidates = self._name_candidates(name)
+            if name_candidates is not None:
+                candidate_sets.append(name_candidates)
+        if not candidate_sets:
+            if not name:
+                return list(self.products)
+            # Búsqueda de menos de tres letras: se comprueban todos los nombres
+            candidate_sets.append(range(len(self.products)))
+
+        candidates = min(candidate_sets, key=len)
+        result = []
+        for position in sorted(candidates):
+            product = self.products[position]
+            if category and product["category"] != category:
+                continue
+            if min_price is not None and product["price"] < min_price:
+                continue
+            if max_price is not None and product["price"] > max_price:
+                continue
+            if name and name not in self.names[position]:
+                continue
+            result.append(product)
+        return result
+
+class ColumnarProductIndex:
+    """
+    Alternativa a ProductIndex que guarda el catálogo por columnas en arrays de NumPy:
+    id y precio como arrays numéricos, la categoría como códigos enteros y los nombres
+    en minúsculas como un array de cadenas. Cada filtro se evalúa como una máscara
+    booleana vectorizada sobre todo el catálogo, sin bucles de Python.
+    """
+
+    def __init__(self, products):
+        if np is None:
+            raise ValueError("El índice columnar necesita NumPy")
+        self.products = products
+        self.ids = np.array([product["id"] for product in products], dtype=np.int64)
+        self.prices = np.array([product["price"] for product in products], dtype=np.float64)
+        categories, codes = np.unique(
+            np.array([product["category"] for product in products], dtype=str), return_inverse=True
+        )
+        self.category_codes = {category: code for code, category in enumerate(categories.tolist())}
+        self.categories = codes.astype(np.int32)
+        self.names = np.array([product["name"].lower() for product in products], dtype=str)
+
+    def search(self, category=None, min_price=None, max_price=None, name=None):
+        """
+        Devuelve los productos que cumplen todos los filtros indicados,
+        en el mismo orden que la lista original
+        """
+        mask = np.ones(len(self.products), dtype=bool)
+        if category:
+            code = self.category_codes.get(category)
+            if code is None:
+                return []
+            mask &= self.categories == code
+        if min_price is not None:
+            mask &= self.prices >= min_price
+        if max_price is not None:
+            mask &= self.prices <= max_price
+        positions = np.flatnonzero(mask)
+        if name:
+            # La búsqueda de texto solo se hace sobre las filas que ya han pasado los filtros
+            found = np.char.find(self.names[positions], name.lower()) >= 0
+            positions = positions[found]
+        return [self.products[position] for position in positions.tolist()]
+
+
+# Implementaciones disponibles del índice de productos
+INDEX_BACKENDS = {
+    "python": ProductIndex,
+    "numpy": ColumnarProductIndex,
+}
+
+def create_app(index_backend="python"):
+    """
+    Crea y configura la aplicación Flask.
+    `index_backend` elige el índice de búsqueda: "python" (por defecto) o "numpy".
     """
     app = Flask(__name__)
+    # jsonify() y request.get_json() usan el proveedor JSON de json_provider_2c.py
+    app.json = FastJSONProvider(app)
+
+    # Índices de búsqueda, construidos una sola vez al crear la aplicación
+    if index_backend not in INDEX_BACKENDS:
+        raise ValueError(f"Índice desconocido: {index_backend!r}")
+    product_index = INDEX_BACKENDS[index_backend](products)
 
     @app.route('/products', methods=['GET'])
     def get_products():
@@ -59,36 +205,34 @@ def create_app():
         - min_price: Precio mínimo
         - max_price: Precio máximo
         - name: Buscar por nombre (coincidencia parcial)
+        - limit, cursor, fields: Paginación y proyección de campos (ver paginate)
         """
         # Implementa aquí el filtrado de productos según los parámetros de consulta
         # 1. Obtén los parámetros de consulta usando request.args
         # 2. Filtra la lista de productos según los parámetros proporcionados
         # 3. Devuelve la lista filtrada en formato JSON con código 200
-        result = products[:]
-        
-        # Filtrar por categoría
-        category = request.args.get('category')
-        if category:
-            result = [p for p in result if p['category'] == category]
-        
-        # Filtrar por precio mínimo
         min_price = request.args.get('min_price')
-        if min_price:
-            min_price = float(min_price)
-            result = [p for p in result if p['price'] >= min_price]
-        
-        # Filtrar por precio máximo
         max_price = request.args.get('max_price')
-        if max_price:
-            max_price = float(max_price)
-            result = [p for p in result if p['price'] <= max_price]
-        
-        # Filtrar por nombre (búsqueda parcial)
-        name = request.args.get('name')
-        if name:
-            result = [p for p in result if name.lower() in p['name'].lower()]
-        
-        return jsonify(result)
+        result = product_index.search(
+            category=request.args.get('category'),
+            min_price=float(min_price) if min_price else None,
+            max_price=float(max_price) if max_price else None,
+            name=request.args.get('name'),
+        )
+
+        # Paginación (limit, cursor) y proyección de campos (fields)
+        try:
+            page, next_cursor = paginate(result, request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if request.args.get('limit'):
+            response = jsonify(page)
+        else:
+            # Listado completo: se serializa y se envía por fragmentos
+            response = app.json.stream_array(page)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
 
     return app
 
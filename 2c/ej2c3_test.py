@@ -1,6 +1,7 @@
 import pytest
 from flask.testing import FlaskClient
-from ej2c3 import create_app
+import random
+from ej2c3 import create_app, ProductIndex, ColumnarProductIndex
 
 @pytest.fixture
 def client() -> FlaskClient:
@@ -114,3 +115,94 @@ def test_filter_no_results(client):
     assert response.status_code == 200
     data = response.json
     assert len(data) == 0  # No debería haber productos
+
+@pytest.mark.parametrize("index_class", [ProductIndex, ColumnarProductIndex])
+def test_product_index_matches_linear_filter(index_class):
+    """
+    Prueba que el índice devuelve lo mismo que filtrar la lista completa, en el mismo orden
+    """
+    rng = random.Random(0)
+    words = ["Laptop", "Pro", "Mini", "Chair", "Smart", "Desk", "Max", "Lite"]
+    catalog = [
+        {
+            "id": i,
+            "name": " ".join(rng.sample(words, 2)),
+            "price": round(rng.uniform(1, 1000), 2),
+            "category": rng.choice(["electronics", "furniture", "appliances"]),
+        }
+        for i in range(500)
+    ]
+    index = index_class(catalog)
+    queries = [
+        {},
+        {"category": "furniture"},
+        {"min_price": 100.0, "max_price": 250.5},
+        {"name": "pro"},
+        {"name": "ma"},
+        {"name": "smart desk"},
+        {"category": "electronics", "min_price": 500.0, "name": "LAP"},
+        {"category": "unknown"},
+    ]
+    for query in queries:
+        expected = [
+            p for p in catalog
+            if (not query.get("category") or p["category"] == query["category"])
+            and (query.get("min_price") is None or p["price"] >= query["min_price"])
+            and (query.get("max_price") is None or p["price"] <= query["max_price"])
+            and (not query.get("name") or query["name"].lower() in p["name"].lower())
+        ]
+        assert index.search(**query) == expected, f"Resultado incorrecto para {query}"
+
+def test_pagination_and_fields(client):
+    """
+    Prueba la paginación con limit y cursor y la proyección de campos con fields
+    """
+    response = client.get("/products?category=electronics&limit=3&fields=id,name")
+    assert response.status_code == 200
+    assert response.json == [
+        {"id": 1, "name": "Laptop Pro"},
+        {"id": 2, "name": "Smartphone X"},
+        {"id": 3, "name": "Tablet Mini"},
+    ]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/products?category=electronics&limit=3&cursor={cursor}")
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json] == [7]
+    assert "X-Next-Cursor" not in response.headers  # No hay más páginas
+
+    assert client.get("/products?limit=abc").status_code == 400
+    assert client.get("/products?cursor=invalid").status_code == 400
+
+def test_numpy_index_backend():
+    """
+    Prueba la aplicación con el índice columnar de NumPy
+    """
+    app = create_app(index_backend="numpy")
+    with app.test_client() as client:
+        response = client.get("/products?category=electronics&min_price=500")
+        assert response.status_code == 200
+        assert [p["id"] for p in response.json] == [1, 2]
+
+        response = client.get("/products?name=Pro&max_price=100")
+        assert [p["name"] for p in response.json] == ["Coffee Maker Pro"]
+
+def test_get_products_streamed():
+    """
+    Prueba que el listado sin limit se envía por fragmentos y contiene un array JSON válido
+    """
+    app = create_app()
+    with app.test_client() as client:
+        response = client.get("/products?fields=id", buffered=False)
+        assert response.is_streamed
+        assert next(response.response) == b"["
+        response.close()
+
+        response = client.get("/products?fields=id")
+        assert response.json == [{"id": i} for i in range(1, 9)]
+
+    # Más elementos que un grupo de serialización y un listado vacío
+    with app.app_context():
+        response = app.json.stream_array(({"id": i} for i in range(2500)), batch_size=1000)
+        assert response.json == [{"id": i} for i in range(2500)]
+        assert app.json.stream_array([]).get_data() == b"[]\n"
@@ -0,0 +1,126 @@
+"""
+Proveedor JSON para las aplicaciones Flask de este apartado (ej2c1, ej2c2 y ej2c3).
+
+Cada apartado tiene su propia copia con el nombre del apartado en el del módulo
+(json_provider_2c), para que al ejecutar juntas las pruebas de todos los apartados
+cada aplicación importe la suya y no la del primer apartado que se cargue.
+
+Se instala en `create_app()` con `app.json = FastJSONProvider(app)` y a partir de ese
+momento lo usan `jsonify()`, `request.get_json()` y `app.json.dumps()`. Respecto al
+proveedor por defecto de Flask:
+
+- Reutiliza los codificadores `json.JSONEncoder` en lugar de crear uno en cada llamada,
+  que es lo que hace `json.dumps()` en cuanto recibe alguna opción.
+- Escribe UTF-8 sin escapar (`ensure_ascii = False`), que ocupa menos. Se puede volver
+  al comportamiento de Flask con `app.json.ensure_ascii = True`.
+- Genera las respuestas directamente en bytes y sin espacios entre separadores.
+- Si la biblioteca `orjson` está instalada, la usa para codificar y decodificar
+  (`app.json.accelerated = False` la desactiva). Si no lo está, o si `orjson` no admite
+  un valor (por ejemplo, un entero de más de 64 bits), se usa el módulo `json`.
+
+Para listados muy grandes, `app.json.stream_array(items)` envía el array JSON por
+fragmentos a medida que lo serializa, en lugar de construir antes toda la respuesta.
+"""
+
+from itertools import islice
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Proveedor JSON con codificadores reutilizables y orjson opcional
+    """
+
+    ensure_ascii = False
+    accelerated = orjson is not None
+
+    def __init__(self, app):
+        super().__init__(app)
+        self._encoders = {}
+
+    def _encoder(self, indent):
+        """
+        Devuelve el codificador de la biblioteca estándar para las opciones actuales
+        """
+        key = (self.ensure_ascii, self.sort_keys, indent)
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            encoder = json.JSONEncoder(
+                default=self.default,
+                ensure_ascii=self.ensure_ascii,
+                sort_keys=self.sort_keys,
+                indent=indent,
+                separators=(",", ": ") if indent else (",", ":"),
+            )
+            self._encoders[key] = encoder
+        return encoder
+
+    def dumps_bytes(self, obj, indent=None):
+        """
+        Serializa `obj` como JSON en UTF-8. `indent` solo admite None o 2.
+        """
+        # orjson siempre escribe UTF-8 sin escapar, así que no sirve con ensure_ascii
+        if self.accelerated and not self.ensure_ascii:
+            # Las fechas y las dataclasses se pasan a `default` para que salgan igual
+            # que con Flask (fechas en formato HTTP)
+            option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+            if self.sort_keys:
+                option |= orjson.OPT_SORT_KEYS
+            if indent:
+                option |= orjson.OPT_INDENT_2
+            try:
+                return orjson.dumps(obj, default=self.default, option=option)
+            except orjson.JSONEncodeError:
+                pass
+        return self._encoder(indent).encode(obj).encode()
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if self.accelerated and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                # Se repite con `json` para aceptar lo mismo que él (NaN, enteros enormes)
+                # o lanzar su mismo error
+                pass
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = 2 if (self.compact is None and self._app.debug) or self.compact is False else None
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+    def stream_array(self, items, batch_size=1000):
+        """
+        Devuelve una respuesta con un array JSON que se genera a medida que se envía.
+
+        Los elementos se serializan en grupos de `batch_size`, así que la memoria usada
+        no depende del número de elementos. Al no conocerse la longitud, el servidor
+        envía el cuerpo con Transfer-Encoding: chunked. El "[" inicial sale enseguida,
+        sin esperar a serializar el primer grupo.
+        """
+        def generate():
+            iterator = iter(items)
+            yield b"["
+            separator = b""
+            while True:
+                batch = list(islice(iterator, batch_size))
+                if not batch:
+                    break
+                # Se serializa el grupo como una lista y se le quitan los corchetes
+                yield separator + self.dumps_bytes(batch)[1:-1]
+                separator = b","
+            yield b"]\n"
+
+        return self._app.response_class(generate(), mimetype=self.mimetype)
@@ -0,0 +1,440 @@
+"""
+Almacenamiento de tareas para la API de ej2c2.
+
+Las tareas se guardan en un diccionario ID -> tarea. Como los diccionarios de Python
+conservan el orden de inserción, recorrer el almacén devuelve las tareas en el orden
+en que se crearon, y buscar, actualizar o eliminar una tarea cuesta O(1) sea cual sea
+el número de tareas.
+
+Los IDs los asigna un asignador de IDs, por defecto `CounterIdAllocator`: un
+`itertools.count`, cuyo `next()` es atómico, así que varios hilos pueden crear tareas a
+la vez sin bloqueos ni IDs repetidos.
+
+`SQLiteTaskStore` ofrece la misma interfaz que `TaskStore` pero guarda las tareas en
+una base de datos SQLite, de modo que sobreviven a un reinicio y se comparten entre
+procesos (por ejemplo, los workers de gunicorn); los IDs los asigna la propia base de
+datos.
+
+Los dos almacenes publican cada cambio en un `ChangeFeed`: un búfer circular en memoria
+con los últimos cambios numerados, del que los clientes leen los que se han producido
+después de un número de secuencia dado.
+"""
+
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import Future
+import itertools
+import queue
+import sqlite3
+import threading
+
+
+class CounterIdAllocator:
+    """
+    Asignador de IDs dentro de un único proceso
+    """
+
+    def __init__(self, start=1):
+        self._counter = itertools.count(start)
+
+    def next_id(self):
+        return next(self._counter)
+
+
+class ChangesExpired(Exception):
+    """
+    Los cambios posteriores al número de secuencia pedido ya no están en el búfer
+    """
+
+
+class ChangeFeed:
+    """
+    Búfer circular con los últimos `maxlen` cambios de un almacén de tareas.
+
+    Cada cambio recibe un número de secuencia consecutivo ("seq") y es un diccionario
+    {"seq", "op", "id"} al que los cambios "create" y "update" añaden la tarea ("task").
+    Al llenarse el búfer se descartan los cambios más antiguos.
+    """
+
+    def __init__(self, maxlen=1024):
+        self._events = deque(maxlen=maxlen)
+        self._condition = threading.Condition()
+        self.last_seq = 0
+
+    def publish(self, op, task_id, task=None):
+        """
+        Añade un cambio al búfer y despierta a los lectores que esperan
+        """
+        with self._condition:
+            self.last_seq += 1
+            event = {"seq": self.last_seq, "op": op, "id": task_id}
+            if task is not None:
+                event["task"] = dict(task)
+            self._events.append(event)
+            self._condition.notify_all()
+        return event
+
+    def since(self, seq, timeout=None, limit=None):
+        """
+        Devuelve los cambios con número de secuencia mayor que `seq` (como mucho `limit`).
+        Si todavía no hay ninguno, espera hasta `timeout` segundos a que llegue alguno y,
+        si no llega, devuelve una lista vacía.
+        Lanza ChangesExpired si alguno de esos cambios ya se ha descartado del búfer, o si
+        `seq` es de una secuencia que este búfer no ha generado (por ejemplo, tras un reinicio).
+        """
+        with self._condition:
+            if timeout:
+                self._condition.wait_for(lambda: self.last_seq != seq, timeout)
+            pending = self.last_seq - seq
+            if pending < 0 or pending > len(self._events):
+                raise ChangesExpired(seq)
+            # Los números son consecutivos: los pendientes son los últimos del búfer
+            events = list(itertools.islice(reversed(self._events), pending))
+        events.reverse()
+        return events[:limit] if limit else events
+
+
+class TaskStore:
+    """
+    Repositorio de tareas en memoria
+    """
+
+    def __init__(self, id_allocator=None, changes=None):
+        self._tasks = {}
+        self._ids = id_allocator or CounterIdAllocator()
+        self.changes = changes or ChangeFeed()
+        # Número de versión: aumenta con cada cambio, así que dos lecturas con la misma
+        # versión devuelven exactamente las mismas tareas
+        self.version = 0
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        # Se recorre una copia para que las modificaciones concurrentes no interfieran
+        return iter(list(self._tasks.values()))
+
+    def iter_after(self, after_id):
+        """
+        Recorre las tareas con ID mayor que `after_id`, en orden de ID
+        """
+        with self._lock:
+            ids = list(self._tasks)
+            tasks = list(self._tasks.values())
+        # Las tareas se guardan en orden de ID, así que la primera se encuentra con bisect
+        return itertools.islice(tasks, bisect_right(ids, after_id), None)
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def get(self, task_id):
+        """
+        Devuelve la tarea con el ID indicado o None si no existe
+        """
+        return self._tasks.get(task_id)
+
+    def add(self, name):
+        """
+        Crea una tarea nueva con el siguiente ID disponible y la devuelve
+        """
+        with self._lock:
+            # El ID se asigna con el lock adquirido para que las tareas se guarden en
+            # orden de ID, que es el orden en el que las recorre la paginación por cursor
+            task = {"id": self._ids.next_id(), "name": name}
+            self._tasks[task["id"]] = task
+            self.version += 1
+            self.changes.publish("create", task["id"], task)
+        return task
+
+    def update(self, task_id, name):
+        """
+        Cambia el nombre de una tarea. Devuelve la tarea actualizada o None si no existe.
+        """
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is not None:
+                task["name"] = name
+                self.version += 1
+                self.changes.publish("update", task_id, task)
+        return task
+
+    def delete(self, task_id):
+        """
+        Elimina una tarea. Devuelve True si existía.
+        """
+        with self._lock:
+            if self._tasks.pop(task_id, None) is None:
+                return False
+            self.version += 1
+            self.changes.publish("delete", task_id)
+        return True
+
+    def apply_batch(self, operations):
+        """
+        Aplica una lista de operaciones (op, task_id, name), donde op es "create",
+        "update" o "delete", y devuelve lo que devolvería cada operación por separado
+        """
+        return [self._apply(op, task_id, name) for op, task_id, name in operations]
+
+    def _apply(self, op, task_id, name):
+        if op == "create":
+            return self.add(name)
+        if op == "update":
+            return self.update(task_id, name)
+        return self.delete(task_id)
+
+
+class SQLiteTaskStore:
+    """
+    Repositorio de tareas persistente en SQLite.
+
+    - La base de datos usa el modo WAL, en el que las lecturas no esperan a las escrituras.
+    - Cada hilo reutiliza su propia conexión, y cada conexión reutiliza las sentencias ya
+      preparadas porque el SQL de cada operación es siempre el mismo texto.
+    - Con `group_commit=True` las escrituras de todos los hilos se envían a un único hilo
+      escritor, que las agrupa en una sola transacción (un solo COMMIT y un solo fsync)
+      de hasta `max_batch` operaciones. Cada petición espera a que su lote se confirme.
+    - Los cambios se publican en `changes` cuando se confirma su transacción. El búfer
+      está en memoria, así que solo recoge los cambios hechos desde este proceso.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS tasks_version (version INTEGER NOT NULL);"
+        "INSERT INTO tasks_version SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM tasks_version);"
+    )
+    SELECT_VERSION = "SELECT version FROM tasks_version"
+    BUMP_VERSION = "UPDATE tasks_version SET version = version + 1"
+    SELECT_AFTER = "SELECT id, name FROM tasks WHERE id > ? ORDER BY id LIMIT ?"
+    SELECT_ONE = "SELECT id, name FROM tasks WHERE id = ?"
+    COUNT = "SELECT COUNT(*) FROM tasks"
+    INSERT = "INSERT INTO tasks (name) VALUES (?)"
+    UPDATE = "UPDATE tasks SET name = ? WHERE id = ?"
+    DELETE = "DELETE FROM tasks WHERE id = ?"
+    # Número de tareas que se leen en cada consulta al recorrer el almacén
+    ITER_BATCH = 1000
+
+    def __init__(self, path, group_commit=False, max_batch=256, synchronous="NORMAL", changes=None,
+                 timeout=30):
+        if synchronous not in ("OFF", "NORMAL", "FULL"):
+            raise ValueError(f"Invalid synchronous mode: {synchronous!r}")
+        self.path = path
+        self.synchronous = synchronous
+        # Segundos que se espera a que otro proceso libere la base de datos
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.changes = changes or ChangeFeed()
+        # Cambios de la transacción en curso, pendientes de publicar tras el COMMIT.
+        # Las transacciones de este proceso son siempre de una en una (_write_lock o
+        # el hilo escritor), así que basta con una sola lista.
+        self._pending_changes = []
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(self.SCHEMA)
+        self._writes = None
+        if group_commit:
+            self._writes = queue.Queue()
+            self._writer = threading.Thread(target=self._write_loop, name="tasks-writer", daemon=True)
+            self._writer.start()
+
+    def _connection(self):
+        """
+        Devuelve la conexión del hilo actual, creándola la primera vez
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            # En modo WAL, NORMAL solo sincroniza el disco en los checkpoints;
+            # FULL sincroniza en cada COMMIT, que es cuando más se nota el group commit
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """
+        Detiene el hilo escritor y cierra todas las conexiones
+        """
+        if self._writes is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writes = None
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    @property
+    def version(self):
+        """
+        Número de versión de las tareas, guardado en la propia base de datos para que
+        sea el mismo en todos los procesos. Cada escritura lo aumenta en su transacción.
+        """
+        return self._connection().execute(self.SELECT_VERSION).fetchone()[0]
+
+    def __iter__(self):
+        return self.iter_after(0)
+
+    def iter_after(self, after_id):
+        """
+        Recorre las tareas con ID mayor que `after_id`, en orden de ID.
+        Se leen por bloques con la clave primaria, de modo que recorrer la tabla entera
+        no la carga en memoria ni deja abierta una consulta entre bloques.
+        """
+        conn = self._connection()
+        last_id = after_id
+        while True:
+            rows = conn.execute(self.SELECT_AFTER, (last_id, self.ITER_BATCH)).fetchall()
+            for task_id, name in rows:
+                yield {"id": task_id, "name": name}
+            if len(rows) < self.ITER_BATCH:
+                return
+            last_id = rows[-1][0]
+
+    def __len__(self):
+        return self._connection().execute(self.COUNT).fetchone()[0]
+
+    def get(self, task_id):
+        row = self._connection().execute(self.SELECT_ONE, (task_id,)).fetchone()
+        return {"id": row[0], "name": row[1]} if row else None
+
+    def add(self, name):
+        return self._write(self._add, name)
+
+    def update(self, task_id, name):
+        return self._write(self._update, task_id, name)
+
+    def delete(self, task_id):
+        return self._write(self._delete, task_id)
+
+    def apply_batch(self, operations):
+        """
+        Aplica una lista de operaciones (op, task_id, name) en una sola transacción
+        y devuelve el resultado de cada una
+        """
+        return self._write(self._apply_batch, operations)
+
+    # Operaciones de escritura: se ejecutan dentro de una transacción abierta
+
+    def _apply_batch(self, conn, operations):
+        results = []
+        for op, task_id, name in operations:
+            if op == "create":
+                results.append(self._add(conn, name))
+            elif op == "update":
+                results.append(self._update(conn, task_id, name))
+            else:
+                results.append(self._delete(conn, task_id))
+        return results
+
+    def _add(self, conn, name):
+        cursor = conn.execute(self.INSERT, (name,))
+        conn.execute(self.BUMP_VERSION)
+        task = {"id": cursor.lastrowid, "name": name}
+        self._pending_changes.append(("create", task["id"], task))
+        return task
+
+    def _update(self, conn, task_id, name):
+        if not conn.execute(self.UPDATE, (name, task_id)).rowcount:
+            return None
+        conn.execute(self.BUMP_VERSION)
+        task = {"id": task_id, "name": name}
+        self._pending_changes.append(("update", task_id, task))
+        return task
+
+    def _delete(self, conn, task_id):
+        if not conn.execute(self.DELETE, (task_id,)).rowcount:
+            return False
+        conn.execute(self.BUMP_VERSION)
+        self._pending_changes.append(("delete", task_id, None))
+        return True
+
+    def _publish_changes(self):
+        for op, task_id, task in self._pending_changes:
+            self.changes.publish(op, task_id, task)
+        self._pending_changes.clear()
+
+    def _write(self, operation, *args):
+        if self._writes is None:
+            conn = self._connection()
+            # El lock mantiene el orden de los cambios publicados igual que el de los COMMIT
+            with self._write_lock:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = operation(conn, *args)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    self._pending_changes.clear()
+                    conn.execute("ROLLBACK")
+                    raise
+                self._publish_changes()
+            return result
+        future = Future()
+        self._writes.put((operation, args, future))
+        return future.result()
+
+    def _write_loop(self):
+        """
+        Hilo escritor: toma todas las escrituras pendientes (hasta max_batch) y las
+        confirma juntas en una transacción
+        """
+        conn = self._connection()
+        while True:
+            item = self._writes.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._writes.put(None)
+                    break
+                batch.append(item)
+
+            try:
+                results = self._commit_batch(conn, batch)
+            except Exception as e:
+                # Ha fallado la transacción en sí (base de datos bloqueada, error de E/S...):
+                # falla todo el lote, pero el hilo sigue atendiendo las escrituras siguientes
+                if conn.in_transaction:
+                    try:
+                        conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+                self._pending_changes.clear()
+                results = [(future, None, e) for _, _, future in batch]
+            self._publish_changes()
+            for future, result, error in results:
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    def _commit_batch(self, conn, batch):
+        """
+        Aplica un lote de escrituras en una transacción y devuelve (future, resultado,
+        error) de cada una. Lanza una excepción si no se puede abrir o confirmar.
+        """
+        results = []
+        conn.execute("BEGIN IMMEDIATE")
+        for operation, args, future in batch:
+            # Un SAVEPOINT por operación: si una falla, no arrastra al resto del lote
+            conn.execute("SAVEPOINT op")
+            pending = len(self._pending_changes)
+            try:
+                results.append((future, operation(conn, *args), None))
+                conn.execute("RELEASE op")
+            except Exception as e:
+                conn.execute("ROLLBACK TO op")
+                conn.execute("RELEASE op")
+                del self._pending_changes[pending:]
+                results.append((future, None, e))
+        conn.execute("COMMIT")
+        return results
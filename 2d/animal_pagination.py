@@ -0,0 +1,69 @@
+"""
+Paginación por cursor y proyección de campos del listado de animales de ej2d3.
+
+El listado se recorre en orden de ID. El cursor codifica el ID del último animal
+devuelto, así que la página siguiente continúa justo después aunque entre tanto se
+hayan creado o borrado animales.
+"""
+
+import base64
+import binascii
+import json
+from itertools import islice
+
+# Tamaño máximo de página en los listados paginados
+MAX_PAGE_SIZE = 1000
+
+
+def encode_cursor(last_id):
+    """
+    Codifica como cursor opaco el ID del último elemento devuelto
+    """
+    return base64.urlsafe_b64encode(json.dumps({"after": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Devuelve el ID contenido en un cursor. Lanza ValueError si el cursor no es válido.
+    """
+    try:
+        after = json.loads(base64.urlsafe_b64decode(cursor.encode()))["after"]
+    except (ValueError, TypeError, KeyError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if type(after) is not int:
+        raise ValueError("Invalid cursor")
+    return after
+
+
+def paginate(items, args):
+    """
+    Aplica los parámetros de paginación y proyección de un listado ordenado por ID:
+    - limit: número máximo de elementos (como mucho MAX_PAGE_SIZE)
+    - cursor: continúa justo después del último elemento de la página anterior
+    - fields: lista de campos separados por comas que se incluyen en cada elemento
+    Devuelve la página y el cursor de la siguiente (None si no hay más).
+    Lanza ValueError si algún parámetro no es válido.
+    """
+    limit = args.get('limit')
+    cursor = args.get('cursor')
+    fields = args.get('fields')
+
+    if cursor:
+        after = decode_cursor(cursor)
+        items = (item for item in items if item["id"] > after)
+    if limit:
+        if not limit.isdigit() or int(limit) == 0:
+            raise ValueError("limit must be a positive integer")
+        limit = min(int(limit), MAX_PAGE_SIZE)
+        # Se pide un elemento más para saber si hay página siguiente
+        page = list(islice(items, limit + 1))
+        next_cursor = encode_cursor(page[limit - 1]["id"]) if len(page) > limit else None
+        page = page[:limit]
+    else:
+        page = list(items)
+        next_cursor = None
+
+    if fields:
+        names = [name for name in fields.split(',') if name]
+        page = [{name: item[name] for name in names if name in item} for item in page]
+    return page, next_cursor
@@ -31,8 +31,13 @@ Ejemplo:
 Tu tarea es implementar esta API en Flask con el manejo adecuado de errores.
 """
 
-from flask import Flask, jsonify, request, abort
+from flask import Flask, Response, jsonify, request, abort
 import logging
+import hashlib
+import threading
+from itertools import count
+from animal_pagination import paginate
+from json_provider_2d import FastJSONProvider
 
 # Configuración del registro (logging)
 logging.basicConfig(level=logging.INFO)
@@ -45,14 +50,22 @@ animals = [
     {"id": 3, "name": "Jirafa", "species": "Giraffa camelopardalis"}
 ]
 
-# Este contador se usará para asignar IDs únicos
-next_id = 4
+# Este contador se usará para asignar IDs únicos. next() sobre un itertools.count es
+# atómico, así que dos peticiones simultáneas nunca reciben el mismo ID
+animal_ids = count(4)
+
+# Versión de la lista de animales: aumenta con cada alta o baja. Los cambios se hacen
+# con el lock adquirido para que la versión y la lista siempre vayan a la par.
+animals_version = 0
+animals_lock = threading.Lock()
 
 def create_app():
     """
     Crea y configura la aplicación Flask con manejadores de errores personalizados
     """
     app = Flask(__name__)
+    # jsonify() y request.get_json() usan el proveedor JSON de json_provider_2d.py
+    app.json = FastJSONProvider(app)
     
     # Manejador de errores 400 - Bad Request
     @app.errorhandler(400)
@@ -107,13 +120,40 @@ def create_app():
         app.logger.error(f"Internal Server Error (500) at {request.path}: {error}")
         return jsonify({"error": "Internal Server Error"}), 500
 
+    # Último listado serializado: ((versión, query string), cuerpo, cursor siguiente)
+    listing_cache = [(None, None, None)]
+
     @app.route('/animals', methods=['GET'])
     def get_animals():
         """
-        Devuelve la lista completa de animales
+        Devuelve la lista completa de animales.
+        Admite paginación (limit, cursor) y proyección de campos (fields).
         """
         # Implementa este endpoint para devolver la lista de animales
-        return jsonify(animals)
+        # La versión se lee antes que los datos: así un ETag nunca describe datos más antiguos
+        version = animals_version
+        key = (version, request.query_string)
+        etag = f"animals-{version}"
+        if request.query_string:
+            etag += "-" + hashlib.sha1(request.query_string).hexdigest()[:16]
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        cached_key, body, next_cursor = listing_cache[0]
+        if cached_key != key:
+            try:
+                page, next_cursor = paginate(list(animals), request.args)
+            except ValueError:
+                abort(400)
+            body = jsonify(page).get_data()
+            listing_cache[0] = (key, body, next_cursor)
+        response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        if next_cursor:
+            response.headers['X-Next-Cursor'] = next_cursor
+        return response
 
     @app.route('/animals/<int:animal_id>', methods=['GET'])
     def get_animal(animal_id):
@@ -140,14 +180,16 @@ def create_app():
         # 2. Verifica que los campos "name" y "species" estén presentes
         # 3. Si falta algún campo, usa abort(400) para lanzar un error
         # 4. Si todo está correcto, agrega el nuevo animal a la lista y devuelve una respuesta adecuada (código 201)
-        global next_id
         data = request.get_json()
         if not data or "name" not in data or "species" not in data:
             abort(400)
         
-        new_animal = {"id": next_id, "name": data["name"], "species": data["species"]}
-        animals.append(new_animal)
-        next_id += 1
+        global animals_version
+        with animals_lock:
+            # El ID se asigna con el lock adquirido para que la lista quede ordenada por ID
+            new_animal = {"id": next(animal_ids), "name": data["name"], "species": data["species"]}
+            animals.append(new_animal)
+            animals_version += 1
         return jsonify(new_animal), 201
 
     @app.route('/animals/<int:animal_id>', methods=['DELETE'])
@@ -160,11 +202,13 @@ def create_app():
         # 1. Verifica si el animal existe
         # 2. Si no existe, usa abort(404) para lanzar un error 404
         # 3. Si existe, elimínalo de la lista y devuelve una respuesta adecuada
-        global animals
-        for i, animal in enumerate(animals):
-            if animal["id"] == animal_id:
-                animals.pop(i)
-                return "", 204
+        global animals, animals_version
+        with animals_lock:
+            for i, animal in enumerate(animals):
+                if animal["id"] == animal_id:
+                    animals.pop(i)
+                    animals_version += 1
+                    return "", 204
         abort(404)
 
     # Endpoint adicional que lanza un error 500 para probar el manejador
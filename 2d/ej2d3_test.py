@@ -121,3 +121,37 @@ def test_method_not_allowed(client):
 #     assert "ERROR:" in logs, "Debe registrarse un mensaje de nivel ERROR para errores 500"
 #     assert "test-error" in logs, "El log debe incluir información de la ruta que causó el error"
 
+
+def test_get_animals_paginated(client):
+    """Test GET /animals with limit, cursor and fields"""
+    all_animals = client.get("/animals").json
+
+    response = client.get("/animals?limit=2&fields=name")
+    assert response.status_code == 200
+    assert response.json == [{"name": a["name"]} for a in all_animals[:2]]
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/animals?limit=2&cursor={cursor}")
+    assert response.json == all_animals[2:4]
+
+    response = client.get("/animals?limit=0")
+    assert response.status_code == 400
+    assert "error" in response.json
+
+def test_get_animals_conditional(client):
+    """Test GET /animals returns an ETag and answers If-None-Match with 304 until the list changes"""
+    response = client.get("/animals")
+    etag = response.headers["ETag"]
+
+    response = client.get("/animals", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    created = client.post("/animals", json={"name": "Lobo", "species": "Canis lupus"}).json
+    response = client.get("/animals", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json[-1]["id"] == created["id"]
+
+    etag = response.headers["ETag"]
+    client.delete(f"/animals/{created['id']}")
+    assert client.get("/animals", headers={"If-None-Match": etag}).status_code == 200
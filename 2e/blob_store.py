@@ -0,0 +1,199 @@
+"""
+Almacén de ficheros subidos direccionado por contenido, para ej2e3.
+
+Cada fichero subido recibe un nombre propio (`image_1a2b3c4d.png`), pero su contenido se
+guarda una sola vez, en un "blob" cuyo nombre es el SHA-256 de los datos
+(`blobs/ab/abcdef...`). Si se sube otra vez el mismo contenido, el nuevo nombre apunta al
+blob que ya existe y el fichero recibido se descarta sin escribir nada más (ni esperar
+a que llegue al disco: solo se sincronizan los blobs nuevos).
+
+Un pequeño índice SQLite guarda a qué blob apunta cada nombre y cuántos nombres
+apuntan a cada blob. Al borrar el último nombre, se borra el blob.
+"""
+
+from collections import namedtuple
+import hashlib
+import os
+import sqlite3
+import threading
+
+from body_streams import CHUNK_SIZE, write_temp_file
+
+# digest: SHA-256 del contenido; deduplicated: True si el contenido ya estaba guardado
+Blob = namedtuple("Blob", ["digest", "size", "deduplicated"])
+# Resultado de borrar un fichero: blob_removed es True si ya nadie usaba su contenido
+Deleted = namedtuple("Deleted", ["digest", "blob_removed"])
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    """
+    Calcula el SHA-256 de un fichero leyéndolo por bloques
+    """
+    hasher = hashlib.sha256()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buffer):
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+def fsync_file(path):
+    """
+    Espera a que el contenido de un fichero esté escrito en el disco
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class BlobStore:
+    """
+    Ficheros subidos guardados por su SHA-256, con recuento de referencias
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS blobs (digest TEXT PRIMARY KEY, size INTEGER NOT NULL,"
+        " refcount INTEGER NOT NULL);"
+        "CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, digest TEXT NOT NULL);"
+    )
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.blobs_dir = os.path.join(directory, "blobs")
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self.index_path = os.path.join(directory, "blobs.sqlite3")
+        self._lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.executescript(self.SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path, timeout=30, isolation_level=None)
+
+    def blob_path(self, digest):
+        # Un subdirectorio por los dos primeros caracteres, para no tener todos los
+        # blobs en el mismo directorio
+        return os.path.join(self.blobs_dir, digest[:2], digest)
+
+    def path(self, name):
+        """
+        Devuelve la ruta del contenido de un fichero subido, o None si no existe
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT digest FROM files WHERE name = ?", (name,)).fetchone()
+        finally:
+            conn.close()
+        return self.blob_path(row[0]) if row else None
+
+    def put_stream(self, stream, name, size_hint=None):
+        """
+        Guarda el contenido de `stream` con el nombre `name`. El SHA-256 se calcula a la
+        vez que se escriben los datos en un fichero temporal.
+        """
+        hasher = hashlib.sha256()
+        temp_path, size = write_temp_file(stream, self.directory, size_hint, hasher, fsync=False)
+        # El SHA-256 es el de los bytes que se acaban de escribir, así que no se relee
+        return self._add_file(temp_path, hasher.hexdigest(), size, name)
+
+    def put_file(self, temp_path, digest, size, name):
+        """
+        Guarda con el nombre `name` un fichero ya escrito en `temp_path` cuyo SHA-256
+        debería ser `digest`. El fichero se mueve al almacén o, si el contenido ya estaba,
+        se borra. Como un blob con un SHA-256 equivocado se serviría a todas las subidas
+        de ese contenido, el fichero se vuelve a leer para comprobarlo: si no coincide, se
+        borra y se lanza ValueError.
+        """
+        if os.path.getsize(temp_path) != size or file_sha256(temp_path) != digest:
+            os.unlink(temp_path)
+            raise ValueError("Uploaded data does not match its checksum")
+        return self._add_file(temp_path, digest, size, name)
+
+    def _add_file(self, temp_path, digest, size, name):
+        conn = self._connect()
+        try:
+            # Solo se sincroniza con el disco un contenido nuevo, y antes de la transacción
+            # para no retener las demás altas y bajas durante el fsync
+            synced = conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is None
+            if synced:
+                fsync_file(temp_path)
+            # BEGIN IMMEDIATE serializa las altas y bajas también entre procesos
+            with self._lock:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    updated = conn.execute(
+                        "UPDATE blobs SET refcount = refcount + 1 WHERE digest = ?", (digest,)
+                    ).rowcount
+                    if updated:
+                        os.unlink(temp_path)
+                    else:
+                        if not synced:
+                            # El blob que existía se ha borrado mientras tanto
+                            fsync_file(temp_path)
+                        path = self.blob_path(digest)
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        os.replace(temp_path, path)
+                        conn.execute("INSERT INTO blobs (digest, size, refcount) VALUES (?, ?, 1)", (digest, size))
+                    conn.execute("INSERT INTO files (name, digest) VALUES (?, ?)", (name, digest))
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    if os.path.exists(temp_path):
+                        os.unlink(temp_path)
+                    raise
+        finally:
+            conn.close()
+        return Blob(digest, size, bool(updated))
+
+    def delete(self, name):
+        """
+        Borra un fichero subido. El blob se borra cuando ya no lo usa ningún nombre.
+        Devuelve un Deleted, o None si el fichero no existía.
+        """
+        conn = self._connect()
+        deleted_path = None
+        try:
+            with self._lock:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = conn.execute("SELECT digest FROM files WHERE name = ?", (name,)).fetchone()
+                    if row is None:
+                        conn.execute("ROLLBACK")
+                        return None
+                    digest = row[0]
+                    conn.execute("DELETE FROM files WHERE name = ?", (name,))
+                    conn.execute("UPDATE blobs SET refcount = refcount - 1 WHERE digest = ?", (digest,))
+                    if conn.execute("DELETE FROM blobs WHERE digest = ? AND refcount <= 0", (digest,)).rowcount:
+                        # El blob se aparta dentro de la transacción, para que ninguna
+                        # subida del mismo contenido cuente con él, pero solo se borra tras
+                        # el COMMIT: si este falla, vuelve a su sitio
+                        deleted_path = f"{self.blob_path(digest)}.deleted-{os.urandom(4).hex()}"
+                        os.rename(self.blob_path(digest), deleted_path)
+                    conn.execute("COMMIT")
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    if deleted_path is not None:
+                        os.rename(deleted_path, self.blob_path(digest))
+                    raise
+        finally:
+            conn.close()
+        if deleted_path is not None:
+            os.unlink(deleted_path)
+        return Deleted(digest, deleted_path is not None)
+
+    def stats(self):
+        """
+        Devuelve el número de ficheros y de blobs y los bytes que ocupan los blobs
+        """
+        conn = self._connect()
+        try:
+            files = conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            blobs, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        finally:
+            conn.close()
+        return {"files": files, "blobs": blobs, "bytes": size}
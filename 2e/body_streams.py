@@ -0,0 +1,129 @@
+"""
+Lectura de los cuerpos de las peticiones por bloques para los ejercicios del apartado 2e.
+
+`request.data` carga el cuerpo entero en memoria y, si después se devuelve en la
+respuesta, queda dos veces en memoria. Aquí el cuerpo se lee de `request.stream` en
+bloques de tamaño fijo, de modo que la memoria usada por petición está acotada sea
+cual sea el tamaño del cuerpo.
+
+El tamaño máximo del cuerpo lo controla la opción `MAX_CONTENT_LENGTH` de Flask: si
+se supera, leer `request.stream` lanza un error 413 (Request Entity Too Large).
+
+`write_temp_file` guarda un cuerpo en disco sin pasar entero por memoria, para subidas
+de ficheros de cualquier tamaño.
+"""
+
+import errno
+import os
+import tempfile
+
+from flask import Response, request
+from werkzeug.wsgi import wrap_file
+
+# Tamaño de los bloques en que se leen y se envían los cuerpos
+CHUNK_SIZE = 64 * 1024
+# Los cuerpos de hasta este tamaño se guardan en memoria; los mayores, en un fichero temporal
+SPOOL_MAX_SIZE = 1024 * 1024
+# Tamaño de los bloques en que se escriben en disco los ficheros subidos
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def copy_stream(source, target, chunk_size=CHUNK_SIZE):
+    """
+    Copia `source` en `target` bloque a bloque y devuelve el número de bytes copiados
+    """
+    size = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return size
+        target.write(chunk)
+        size += len(chunk)
+
+
+def spool_body(stream, max_memory=SPOOL_MAX_SIZE, chunk_size=CHUNK_SIZE):
+    """
+    Lee el cuerpo de la petición en un fichero temporal que solo pasa a disco si supera
+    `max_memory` bytes. Devuelve el fichero, rebobinado, y el tamaño del cuerpo.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory)
+    size = copy_stream(stream, spool, chunk_size)
+    spool.seek(0)
+    return spool, size
+
+
+def passthrough_response(content_type):
+    """
+    Devuelve una respuesta con el mismo cuerpo que la petición actual, enviado por bloques.
+
+    El cuerpo se lee entero antes de empezar a responder. Si se fuera devolviendo a
+    medida que llega, un cliente que no lee la respuesta hasta acabar de enviar la
+    petición (como `requests`) se bloquearía con el servidor en cuanto se llenaran los
+    búferes de la conexión. El fichero temporal se cierra (y se borra) al terminar la
+    respuesta.
+    """
+    spool, size = spool_body(request.stream)
+    response = Response(
+        wrap_file(request.environ, spool, CHUNK_SIZE),
+        content_type=content_type,
+        direct_passthrough=True,
+    )
+    response.content_length = size
+    return response
+
+
+def write_temp_file(stream, directory, size_hint=None, hasher=None, chunk_size=UPLOAD_CHUNK_SIZE,
+                    fsync=True):
+    """
+    Guarda el contenido de `stream` en un fichero temporal nuevo de `directory` y
+    devuelve su ruta y su tamaño. Quien lo llama decide después dónde colocarlo (con
+    `os.replace`, que es atómico): así nunca se ve un fichero a medias, y si la subida
+    falla el temporal se borra.
+
+    - Si se conoce el tamaño (`size_hint`, normalmente el Content-Length), se reserva
+      todo el espacio de una vez con `os.posix_fallocate`, donde existe. El fichero queda
+      contiguo en disco y, si no hay espacio, el error llega antes de recibir los datos.
+    - Los bloques se leen con `readinto` sobre un único búfer reutilizado, sin crear un
+      objeto `bytes` nuevo por bloque.
+    - Si se pasa `hasher` (por ejemplo, `hashlib.sha256()`), se le añade cada bloque a
+      medida que se escribe.
+    - Con `fsync=False` el fichero no se sincroniza con el disco al terminar: lo hace
+      quien lo llama, si decide conservarlo.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    try:
+        with open(fd, "wb") as f:
+            if size_hint and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(fd, 0, size_hint)
+                except OSError as e:
+                    # Algunos sistemas de ficheros no lo admiten; en ese caso se escribe
+                    # sin reservar, pero la falta de espacio sí se comunica
+                    if e.errno == errno.ENOSPC:
+                        raise
+            size = 0
+            buffer = memoryview(bytearray(chunk_size))
+            readinto = getattr(stream, "readinto", None)
+            while True:
+                if readinto is not None:
+                    n = readinto(buffer)
+                    chunk = buffer[:n]
+                else:
+                    chunk = stream.read(chunk_size)
+                    n = len(chunk)
+                if not n:
+                    break
+                f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+                size += n
+            if size_hint and size != size_hint:
+                # Se libera el espacio reservado que no se ha llegado a usar
+                f.truncate(size)
+            f.flush()
+            if fsync:
+                os.fsync(fd)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return temp_path, size
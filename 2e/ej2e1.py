@@ -33,12 +33,29 @@ una habilidad fundamental para crear APIs robustas y aplicaciones web interactiv
 
 from flask import Flask, jsonify, request
 import re
+from json_provider_2e import FastJSONProvider
+from body_streams import passthrough_response
 
-def create_app():
+# Tamaño máximo por defecto del cuerpo de las peticiones (16 MB)
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+
+def create_app(config=None):
     """
     Crea y configura la aplicación Flask
+
+    La opción MAX_CONTENT_LENGTH limita el tamaño del cuerpo de las peticiones; las
+    que lo superan reciben un error 413.
     """
     app = Flask(__name__)
+    # jsonify() y request.get_json() usan el proveedor JSON de json_provider_2e.py
+    app.json = FastJSONProvider(app)
+    app.config.update(MAX_CONTENT_LENGTH=MAX_CONTENT_LENGTH)
+    if config:
+        app.config.update(config)
+
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({"error": "Request body too large"}), 413
 
     @app.route('/headers', methods=['GET'])
     def get_headers():
@@ -124,8 +141,9 @@ def create_app():
             data = dict(request.form)
             return jsonify(data)
         else:
-            # Para texto plano y otros tipos
-            return request.data, 200, {'Content-Type': content_type}
+            # Para texto plano y otros tipos: el cuerpo se devuelve por bloques, sin
+            # cargarlo entero en memoria
+            return passthrough_response(content_type)
 
     @app.route('/validate-id', methods=['POST'])
     def validate_id():
@@ -2,6 +2,7 @@ import pytest
 from flask.testing import FlaskClient
 from ej2e1 import create_app
 import json
+import os
 
 
 @pytest.fixture
@@ -118,6 +119,23 @@ def test_echo_endpoint_plain_text(client):
     assert response.status_code == 200, "El código de estado debe ser 200"
     assert response.data.decode() == plain_text, "El texto devuelto debe ser idéntico al enviado"
 
+def test_echo_endpoint_large_body():
+    """
+    Prueba que /echo devuelve cuerpos grandes sin cambios y rechaza los que superan MAX_CONTENT_LENGTH.
+    """
+    app = create_app({"MAX_CONTENT_LENGTH": 4 * 1024 * 1024})
+    client = app.test_client()
+    body = os.urandom(3 * 1024 * 1024)
+
+    response = client.post("/echo", data=body, headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 200
+    assert response.content_length == len(body)
+    assert response.data == body, "El cuerpo devuelto debe ser idéntico al enviado"
+
+    response = client.post("/echo", data=body * 2, headers={"Content-Type": "text/plain"})
+    assert response.status_code == 413
+    assert response.json == {"error": "Request body too large"}
+
 def test_validate_id_valid(client):
     """
     Prueba el endpoint /validate-id con un ID válido.
@@ -35,15 +35,30 @@ Esta actividad te enseñará cómo configurar correctamente los tipos de conteni
 una habilidad esencial para el desarrollo de APIs y servicios web que manejan diferentes formatos de datos.
 """
 
-from flask import Flask, jsonify, Response, send_file, make_response
+from flask import Flask, jsonify, Response, make_response, request
 import os
-import io
+from image_cache import ImageCache, image_etag, parse_image_params
 
-def create_app():
+# Memoria máxima por defecto de la caché de imágenes codificadas (32 MB)
+IMAGE_CACHE_BYTES = 32 * 1024 * 1024
+
+def create_app(config=None):
     """
     Crea y configura la aplicación Flask
+
+    La opción IMAGE_CACHE_BYTES limita la memoria que ocupan las imágenes que GET /image
+    guarda ya codificadas.
     """
     app = Flask(__name__)
+    app.config.update(IMAGE_CACHE_BYTES=IMAGE_CACHE_BYTES)
+    if config:
+        app.config.update(config)
+
+    # La imagen por defecto se genera al arrancar, y con ella se cargan los módulos de
+    # Pillow, para que la primera petición no pague ese coste
+    image_cache = ImageCache(app.config["IMAGE_CACHE_BYTES"])
+    image_cache.warm_up([parse_image_params()])
+    app.extensions["image_cache"] = image_cache
 
     @app.route('/text', methods=['GET'])
     def get_text():
@@ -87,18 +102,33 @@ def create_app():
     def get_image():
         """
         Devuelve una imagen con el tipo MIME `image/png`
+
+        Parámetros opcionales: size (100 por defecto, o anchura x altura como "200x100"),
+        color (nombre o "#rrggbb", "red" por defecto) y format (png, jpeg o gif).
+        Las imágenes codificadas se sirven desde una caché, y la respuesta lleva un ETag
+        para que el cliente pueda reutilizar su copia (304 Not Modified).
         """
         # Implementa este endpoint para devolver el contenido solicitado
-        # Sugerencia: Puedes usar send_file para enviar una imagen
-        # Crear una imagen simple en memoria usando PIL
-        from PIL import Image
-        import io
-        
-        img = Image.new('RGB', (100, 100), color='red')
-        img_io = io.BytesIO()
-        img.save(img_io, 'PNG')
-        img_io.seek(0)
-        return send_file(img_io, mimetype='image/png')
+        try:
+            key = parse_image_params(
+                request.args.get('size', '100'),
+                request.args.get('color', 'red'),
+                request.args.get('format', 'png'),
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        # El ETag no depende de la imagen generada, así que se comprueba antes de generarla
+        etag = image_etag(key)
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            image = image_cache.get(key)
+            response = Response(image.data, mimetype=image.mimetype)
+        response.set_etag(etag)
+        response.cache_control.public = True
+        response.cache_control.max_age = 86400
+        return response
 
     @app.route('/binary', methods=['GET'])
     def get_binary():
@@ -1,6 +1,9 @@
 import pytest
 from flask.testing import FlaskClient
 from ej2e2 import create_app
+from image_cache import ImageCache, parse_image_params
+from PIL import Image
+import io
 
 
 @pytest.fixture
@@ -40,6 +43,37 @@ def test_get_image(client):
     assert response.content_type == "image/png"
     # Opcional: Verificar el tamaño del archivo o contenido binario si es necesario
 
+def test_get_image_parameterized(client):
+    response = client.get("/image?size=40x20&color=%2300ff00&format=jpeg")
+    assert response.status_code == 200
+    assert response.content_type == "image/jpeg"
+    img = Image.open(io.BytesIO(response.data))
+    assert img.format == "JPEG" and img.size == (40, 20)
+
+    # Colores equivalentes comparten la imagen y el ETag
+    assert client.get("/image?color=red").headers["ETag"] == client.get("/image?color=%23ff0000").headers["ETag"]
+    assert client.get("/image?size=0").status_code == 400
+    assert client.get("/image?color=nocolor").status_code == 400
+    assert client.get("/image?format=bmp").status_code == 400
+
+def test_get_image_not_modified(client):
+    response = client.get("/image?size=50")
+    etag = response.headers["ETag"]
+    response = client.get("/image?size=50", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert client.get("/image?size=51", headers={"If-None-Match": etag}).status_code == 200
+
+def test_image_cache_memory_budget():
+    keys = [parse_image_params(color=color) for color in ("red", "blue", "green")]
+    sizes = [len(ImageCache(10**6).get(key).data) for key in keys]
+    cache = ImageCache(max_bytes=sizes[1] + sizes[2])
+    for key in keys:
+        cache.get(key)
+    assert cache.size == sizes[1] + sizes[2]
+    # La menos usada recientemente se ha descartado
+    assert len(cache) == 2 and keys[0] not in cache
+
 def test_get_binary(client):
     response = client.get("/binary")
     assert response.status_code == 200
@@ -34,18 +34,67 @@ Esta actividad te enseñará cómo recibir y manejar diferentes tipos de datos e
 una habilidad esencial para desarrollar APIs web que interactúan con diversos clientes.
 """
 
-from flask import Flask, jsonify, request, Response, make_response
+from flask import Flask, jsonify, request, Response, send_file, url_for
+import mimetypes
 import os
+from werkzeug.http import parse_content_range_header
+from body_streams import passthrough_response
+from blob_store import BlobStore
+from thumbnails import MAX_IMAGE_PIXELS, THUMBNAIL_SIZES, QueueFull, ThumbnailPipeline
+from uploads import MAX_UPLOAD_SESSIONS, UPLOAD_TTL, UploadError, UploadSessions
 
-def create_app():
+# Tamaño máximo por defecto del cuerpo de las peticiones (16 MB)
+MAX_CONTENT_LENGTH = 16 * 1024 * 1024
+# Tamaño máximo por defecto de los ficheros subidos a /image y /binary (8 GB)
+MAX_UPLOAD_SIZE = 8 * 1024 ** 3
+
+def create_app(config=None):
     """
     Crea y configura la aplicación Flask
+
+    La opción MAX_CONTENT_LENGTH limita el tamaño del cuerpo de las peticiones, y
+    MAX_UPLOAD_SIZE el de los ficheros subidos a /image y /binary, que se guardan en
+    disco por bloques. Las peticiones que superan el límite reciben un error 413.
+    UPLOADS_DIR es el directorio donde se guardan (por defecto, uploads en la carpeta
+    instance).
+
+    En las subidas por fragmentos, UPLOAD_TTL es el número de segundos sin actividad tras
+    los que se borra una sesión y MAX_UPLOAD_SESSIONS el de sesiones abiertas a la vez.
+
+    Opciones de las miniaturas de las imágenes subidas a /image:
+    - THUMBNAIL_SIZES: tamaños que se generan (lado mayor, en píxeles)
+    - THUMBNAIL_WORKERS: procesos que las generan (por defecto, uno por CPU)
+    - THUMBNAIL_QUEUE_SIZE: trabajos pendientes a partir de los cuales las subidas de
+      imágenes se rechazan con un error 503
+    - THUMBNAIL_MAX_PIXELS: píxeles a partir de los cuales una imagen no se procesa
     """
     app = Flask(__name__)
+    app.config.update(MAX_CONTENT_LENGTH=MAX_CONTENT_LENGTH, MAX_UPLOAD_SIZE=MAX_UPLOAD_SIZE,
+                      UPLOADS_DIR=None, UPLOAD_TTL=UPLOAD_TTL, MAX_UPLOAD_SESSIONS=MAX_UPLOAD_SESSIONS,
+                      THUMBNAIL_SIZES=THUMBNAIL_SIZES, THUMBNAIL_WORKERS=None, THUMBNAIL_QUEUE_SIZE=32,
+                      THUMBNAIL_MAX_PIXELS=MAX_IMAGE_PIXELS)
+    if config:
+        app.config.update(config)
+
+    @app.errorhandler(413)
+    def request_too_large(error):
+        return jsonify({"error": "Request body too large"}), 413
 
     # Crear un directorio para guardar archivos subidos si no existe
-    uploads_dir = os.path.join(app.instance_path, 'uploads')
+    uploads_dir = app.config["UPLOADS_DIR"] or os.path.join(app.instance_path, 'uploads')
     os.makedirs(uploads_dir, exist_ok=True)
+    # Los ficheros subidos se guardan por su contenido: los repetidos ocupan una sola vez
+    blob_store = BlobStore(uploads_dir)
+    app.extensions["blob_store"] = blob_store
+    # Miniaturas de las imágenes subidas, generadas en un pool de procesos (ver thumbnails.py)
+    thumbnails = ThumbnailPipeline(
+        os.path.join(uploads_dir, 'derived'),
+        sizes=app.config["THUMBNAIL_SIZES"],
+        max_workers=app.config["THUMBNAIL_WORKERS"],
+        max_pending=app.config["THUMBNAIL_QUEUE_SIZE"],
+        max_pixels=app.config["THUMBNAIL_MAX_PIXELS"],
+    )
+    app.extensions["thumbnails"] = thumbnails
 
     @app.route('/text', methods=['POST'])
     def post_text():
@@ -54,12 +103,10 @@ def create_app():
         """
         # Implementa este endpoint:
         # 1. Verifica que el Content-Type sea text/plain
-        # 2. Lee el contenido de la solicitud usando request.data
+        # 2. Lee el contenido de la solicitud por bloques desde request.stream
         # 3. Devuelve el mismo texto con Content-Type text/plain
         if request.content_type and 'text/plain' in request.content_type:
-            response = make_response(request.data)
-            response.headers['Content-Type'] = 'text/plain'
-            return response
+            return passthrough_response('text/plain')
         return Response("Invalid content type", status=400)
 
     @app.route('/html', methods=['POST'])
@@ -72,9 +119,7 @@ def create_app():
         # 2. Lee el contenido de la solicitud
         # 3. Devuelve el mismo HTML con Content-Type text/html
         if request.content_type and 'text/html' in request.content_type:
-            response = make_response(request.data)
-            response.headers['Content-Type'] = 'text/html'
-            return response
+            return passthrough_response('text/html')
         return Response("Invalid content type", status=400)
 
     @app.route('/json', methods=['POST'])
@@ -98,9 +143,7 @@ def create_app():
         # 2. Lee el contenido XML de la solicitud
         # 3. Devuelve el mismo XML con Content-Type application/xml
         if request.content_type and 'application/xml' in request.content_type:
-            response = make_response(request.data)
-            response.headers['Content-Type'] = 'application/xml'
-            return response
+            return passthrough_response('application/xml')
         return Response("Invalid content type", status=400)
 
     @app.route('/image', methods=['POST'])
@@ -110,15 +153,28 @@ def create_app():
         """
         # Implementa este endpoint:
         # 1. Verifica que el Content-Type sea image/png o image/jpeg
-        # 2. Lee los datos binarios de la imagen
+        # 2. Lee los datos binarios de la imagen por bloques desde request.stream
         # 3. Guarda la imagen en el directorio 'uploads' con un nombre único
         # 4. Devuelve una confirmación con el nombre del archivo guardado
+        # 5. Encarga sus miniaturas; el estado del trabajo se consulta en /jobs/<job_id>
         if request.content_type and ('image/png' in request.content_type or 'image/jpeg' in request.content_type):
+            # Con demasiadas imágenes por procesar, se rechaza antes de leer el cuerpo
+            try:
+                thumbnails.reserve()
+            except QueueFull:
+                response = jsonify({"error": "Too many images being processed, try again later"})
+                response.headers['Retry-After'] = '5'
+                return response, 503
             archivo = f"image_{os.urandom(4).hex()}.{'png' if 'png' in request.content_type else 'jpg'}"
-            filepath = os.path.join(uploads_dir, archivo)
-            with open(filepath, 'wb') as f:
-                f.write(request.data)
-            return jsonify({"archivo": archivo, "mensaje": "Imagen guardada"}), 200
+            request.max_content_length = app.config["MAX_UPLOAD_SIZE"]
+            try:
+                blob = blob_store.put_stream(request.stream, archivo, request.content_length)
+            except BaseException:
+                thumbnails.release()
+                raise
+            job_id = thumbnails.submit(blob.digest, blob_store.blob_path(blob.digest))
+            return jsonify({"archivo": archivo, "sha256": blob.digest, "duplicado": blob.deduplicated,
+                            "job_id": job_id, "mensaje": "Imagen guardada"}), 200
         return jsonify({"error": "Invalid content type"}), 400
 
     @app.route('/binary', methods=['POST'])
@@ -132,14 +188,165 @@ def create_app():
         # 3. Guarda los datos en un archivo o simplemente verifica su tamaño
         # 4. Devuelve una confirmación con información sobre los datos recibidos
         if request.content_type and 'application/octet-stream' in request.content_type:
-            data = request.data
             archivo = f"binary_{os.urandom(4).hex()}.bin"
-            filepath = os.path.join(uploads_dir, archivo)
-            with open(filepath, 'wb') as f:
-                f.write(data)
-            return jsonify({"archivo": archivo, "tamaño": len(data), "mensaje": "Datos guardados"}), 200
+            request.max_content_length = app.config["MAX_UPLOAD_SIZE"]
+            blob = blob_store.put_stream(request.stream, archivo, request.content_length)
+            return jsonify({"archivo": archivo, "tamaño": blob.size, "sha256": blob.digest,
+                            "duplicado": blob.deduplicated, "mensaje": "Datos guardados"}), 200
         return jsonify({"error": "Invalid content type"}), 400
 
+    # Subidas de datos binarios por fragmentos, reanudables y en paralelo (ver uploads.py)
+    upload_sessions = UploadSessions(uploads_dir, ttl=app.config["UPLOAD_TTL"],
+                                     max_sessions=app.config["MAX_UPLOAD_SESSIONS"])
+    app.extensions["upload_sessions"] = upload_sessions
+
+    @app.route('/binary/uploads', methods=['POST'])
+    def create_binary_upload():
+        """
+        Crea una sesión de subida por fragmentos. El cuerpo es un JSON con el tamaño del
+        fichero ("size") y, opcionalmente, su SHA-256 ("sha256") para comprobarlo al final.
+        """
+        data = request.get_json(silent=True)
+        size = data.get("size") if isinstance(data, dict) else None
+        if type(size) is not int or size <= 0:
+            return jsonify({"error": "Missing or invalid 'size' field"}), 400
+        max_size = app.config["MAX_UPLOAD_SIZE"]
+        if max_size is not None and size > max_size:
+            return jsonify({"error": "Request body too large"}), 413
+        try:
+            session = upload_sessions.create(size, data.get("sha256"))
+        except UploadError as e:
+            return jsonify({"error": str(e)}), e.status
+        return jsonify(session.to_dict()), 201
+
+    @app.route('/binary/uploads/<upload_id>', methods=['GET'])
+    def get_binary_upload(upload_id):
+        """
+        Devuelve el estado de una subida, con los tramos que faltan por enviar ("missing")
+        """
+        session = upload_sessions.get(upload_id)
+        if session is None:
+            return jsonify({"error": "Upload not found"}), 404
+        return jsonify(session.to_dict()), 200
+
+    @app.route('/binary/uploads/<upload_id>', methods=['PUT'])
+    def put_binary_chunk(upload_id):
+        """
+        Recibe un fragmento de una subida. La cabecera Content-Range (bytes inicio-fin/total)
+        indica su posición en el fichero y X-Chunk-SHA256, opcional, su checksum.
+        """
+        session = upload_sessions.get(upload_id)
+        if session is None:
+            return jsonify({"error": "Upload not found"}), 404
+        content_range = parse_content_range_header(request.headers.get("Content-Range"))
+        if content_range is None or content_range.units != "bytes" or content_range.length != session.size:
+            return jsonify({"error": "Missing or invalid Content-Range"}), 400
+        if request.content_length != content_range.stop - content_range.start:
+            return jsonify({"error": "Content-Length does not match Content-Range"}), 400
+        request.max_content_length = session.size
+        try:
+            session.write_chunk(request.stream, content_range.start, content_range.stop,
+                                request.headers.get("X-Chunk-SHA256"))
+        except UploadError as e:
+            return jsonify({"error": str(e)}), e.status
+        return jsonify(session.to_dict()), 200
+
+    @app.route('/binary/uploads/<upload_id>/complete', methods=['POST'])
+    def complete_binary_upload(upload_id):
+        """
+        Finaliza una subida completa: comprueba su SHA-256 y la guarda como un fichero más
+        """
+        session = upload_sessions.get(upload_id)
+        if session is None:
+            return jsonify({"error": "Upload not found"}), 404
+        if not session.complete:
+            return jsonify({"error": "Upload incomplete", "missing": session.missing()}), 409
+        archivo = f"binary_{os.urandom(4).hex()}.bin"
+        try:
+            sha256 = session.finish()
+        except UploadError as e:
+            if e.status == 409:
+                # Se está reenviando algún fragmento: la sesión sigue abierta y el cliente
+                # puede volver a finalizarla cuando termine
+                return jsonify({"error": str(e), "missing": session.missing()}), 409
+            if e.status != 404:
+                # El checksum no coincide: la subida ya no se puede aprovechar
+                upload_sessions.pop(upload_id)
+                session.discard()
+            return jsonify({"error": str(e)}), e.status
+        if upload_sessions.pop(upload_id) is not session:
+            # Se ha cancelado mientras se finalizaba
+            os.unlink(session.path)
+            return jsonify({"error": "Upload not found"}), 404
+        try:
+            blob = blob_store.put_file(session.path, sha256, session.size, archivo)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 409
+        return jsonify({"archivo": archivo, "tamaño": blob.size, "sha256": blob.digest,
+                        "duplicado": blob.deduplicated, "mensaje": "Datos guardados"}), 200
+
+    @app.route('/binary/uploads/<upload_id>', methods=['DELETE'])
+    def delete_binary_upload(upload_id):
+        """
+        Cancela una subida y borra los datos recibidos
+        """
+        session = upload_sessions.pop(upload_id)
+        if session is None:
+            return jsonify({"error": "Upload not found"}), 404
+        session.discard()
+        return jsonify({"mensaje": "Subida cancelada"}), 200
+
+    @app.route('/uploads/<archivo>', methods=['GET'])
+    def get_upload(archivo):
+        """
+        Devuelve el contenido de un fichero subido
+        """
+        path = blob_store.path(archivo)
+        if path is None:
+            return jsonify({"error": "File not found"}), 404
+        mimetype = mimetypes.guess_type(archivo)[0] or 'application/octet-stream'
+        return send_file(path, mimetype=mimetype, etag=os.path.basename(path), conditional=True)
+
+    @app.route('/uploads/<archivo>', methods=['DELETE'])
+    def delete_upload(archivo):
+        """
+        Borra un fichero subido. Su contenido, y sus miniaturas si es una imagen, se borran
+        cuando ningún otro fichero lo comparte.
+        """
+        deleted = blob_store.delete(archivo)
+        if deleted is None:
+            return jsonify({"error": "File not found"}), 404
+        if deleted.blob_removed:
+            thumbnails.discard(deleted.digest)
+        return jsonify({"mensaje": "Archivo borrado"}), 200
+
+    @app.route('/jobs/<job_id>', methods=['GET'])
+    def get_job(job_id):
+        """
+        Devuelve el estado de un trabajo de miniaturas ("queued", "running", "done" o
+        "failed"), las URL de las miniaturas cuando ha terminado y la ocupación de la cola
+        """
+        job = thumbnails.status(job_id)
+        if job is None:
+            return jsonify({"error": "Job not found"}), 404
+        if job["status"] == "done":
+            job["thumbnails"] = {size: url_for('get_thumbnail', digest=job["digest"], size=size)
+                                 for size in job.pop("sizes")}
+        job["queue"] = {"pending": thumbnails.pending, "max": thumbnails.max_pending}
+        return jsonify(job), 200
+
+    @app.route('/thumbnails/<digest>/<int:size>', methods=['GET'])
+    def get_thumbnail(digest, size):
+        """
+        Devuelve una miniatura, identificada por el SHA-256 de la imagen original y su tamaño
+        """
+        path = thumbnails.thumbnail_path(digest, size)
+        if path is None:
+            return jsonify({"error": "Thumbnail not found"}), 404
+        mimetype = mimetypes.guess_type(path)[0]
+        # Su contenido depende solo de la imagen original y del tamaño
+        return send_file(path, mimetype=mimetype, etag=f"{digest}-{size}", conditional=True, max_age=86400)
+
     return app
 
 if __name__ == '__main__':
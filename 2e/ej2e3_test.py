@@ -1,13 +1,23 @@
 import pytest
 from flask.testing import FlaskClient
 from ej2e3 import create_app
+from blob_store import BlobStore
+from thumbnails import ThumbnailPipeline
+import gc
 import io
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import os
+import signal
+import threading
+import time
+import weakref
+from PIL import Image
 
 
 @pytest.fixture
-def client() -> FlaskClient:
-    app = create_app()
+def client(tmp_path) -> FlaskClient:
+    app = create_app({"UPLOADS_DIR": str(tmp_path)})
     app.testing = True
     with app.test_client() as client:
         yield client
@@ -48,11 +58,9 @@ def test_post_image(client):
     except (ImportError, AttributeError):
         # Fallback: create a simple test image
         import numpy as np
-        from PIL import Image
         face = np.random.randint(0, 255, (100, 100, 3), dtype=np.uint8)
     
     import numpy as np
-    from PIL import Image
 
     # Convert to bytes in PNG format
     img = Image.fromarray(face)
@@ -90,3 +98,310 @@ def test_post_binary(client):
     assert "mensaje" in response.json
     assert "tamaño" in response.json
     assert response.json["tamaño"] == 64  # Should match the size of our test data
+
+def test_post_xml_large_body(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path), "MAX_CONTENT_LENGTH": 4 * 1024 * 1024})
+    client = app.test_client()
+    xml_data = "<items>" + "<item>dato</item>" * 150000 + "</items>"  # ~2.5 MB
+
+    response = client.post("/xml", data=xml_data, content_type="application/xml")
+    assert response.status_code == 200
+    assert response.content_type == "application/xml"
+    assert response.data.decode("utf-8") == xml_data
+
+    response = client.post("/text", data=xml_data * 2, content_type="text/plain")
+    assert response.status_code == 413
+
+def test_post_binary_streamed_to_disk(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path), "MAX_CONTENT_LENGTH": 1024 * 1024, "MAX_UPLOAD_SIZE": 8 * 1024 * 1024})
+    client = app.test_client()
+    uploads_dir = str(tmp_path)
+    binary_data = os.urandom(3 * 1024 * 1024 + 17)  # Mayor que MAX_CONTENT_LENGTH
+
+    response = client.post("/binary", data=binary_data, content_type="application/octet-stream")
+    assert response.status_code == 200
+    assert response.json["tamaño"] == len(binary_data)
+    assert client.get(f"/uploads/{response.json['archivo']}").data == binary_data
+
+    response = client.post("/binary", data=binary_data * 3, content_type="application/octet-stream")
+    assert response.status_code == 413
+    # No quedan ficheros temporales de las subidas
+    assert not [name for name in os.listdir(uploads_dir) if name.startswith(".upload-")]
+
+def test_binary_chunked_upload(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path)})
+    client = app.test_client()
+    data = os.urandom(5 * 1024 * 1024 + 123)
+    chunk = 1024 * 1024
+    ranges = [(start, min(start + chunk, len(data))) for start in range(0, len(data), chunk)]
+
+    response = client.post("/binary/uploads", json={"size": len(data), "sha256": hashlib.sha256(data).hexdigest()})
+    assert response.status_code == 201
+    upload_id = response.json["upload_id"]
+    url = f"/binary/uploads/{upload_id}"
+
+    def put(start, stop, body=None, **headers):
+        headers["Content-Range"] = f"bytes {start}-{stop - 1}/{len(data)}"
+        body = data[start:stop] if body is None else body
+        return app.test_client().put(url, data=body, content_type="application/octet-stream", headers=headers)
+
+    # Un fragmento con checksum incorrecto no cuenta como recibido
+    response = put(*ranges[0], **{"X-Chunk-SHA256": hashlib.sha256(b"otro").hexdigest()})
+    assert response.status_code == 400
+    assert client.get(url).json["received"] == 0
+
+    # Todos los fragmentos salvo el segundo, en orden inverso y en paralelo
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        responses = list(pool.map(lambda r: put(*r), [r for r in reversed(ranges) if r != ranges[1]]))
+    assert all(r.status_code == 200 for r in responses)
+    assert client.get(url).json["missing"] == [list(ranges[1])]
+    assert client.post(f"{url}/complete").status_code == 409
+
+    # Se reanuda enviando solo el fragmento que falta
+    assert put(*ranges[1]).json["complete"]
+    response = client.post(f"{url}/complete")
+    assert response.status_code == 200
+    assert response.json["sha256"] == hashlib.sha256(data).hexdigest()
+    assert client.get(f"/uploads/{response.json['archivo']}").data == data
+    assert client.get(url).status_code == 404
+
+    assert client.post("/binary/uploads", json={"size": 0}).status_code == 400
+    upload_id = client.post("/binary/uploads", json={"size": 10}).json["upload_id"]
+    response = client.put(f"/binary/uploads/{upload_id}", data=b"x" * 10, headers={"Content-Range": "bytes 0-9/20"})
+    assert response.status_code == 400
+    assert client.delete(f"/binary/uploads/{upload_id}").status_code == 200
+
+def test_binary_chunked_upload_rewritten_chunks(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path)})
+    client = app.test_client()
+    data = os.urandom(3 * 1024 * 1024)
+    chunk = 1024 * 1024
+    sha256 = hashlib.sha256(data).hexdigest()
+    upload_id = client.post("/binary/uploads", json={"size": len(data)}).json["upload_id"]
+    url = f"/binary/uploads/{upload_id}"
+
+    def put(start, body=None, **headers):
+        body = data[start:start + chunk] if body is None else body
+        headers["Content-Range"] = f"bytes {start}-{start + chunk - 1}/{len(data)}"
+        return client.put(url, data=body, content_type="application/octet-stream", headers=headers)
+
+    # Un reintento corrupto de un fragmento ya recibido lo vuelve a dejar pendiente
+    assert put(0).status_code == 200
+    response = put(0, os.urandom(chunk), **{"X-Chunk-SHA256": hashlib.sha256(data[:chunk]).hexdigest()})
+    assert response.status_code == 400
+    assert put(chunk).status_code == 200
+    assert client.get(url).json["missing"] == [[0, chunk], [2 * chunk, 3 * chunk]]
+
+    # Reescribir datos que el SHA-256 ya había leído obliga a recalcularlo
+    assert put(0, os.urandom(chunk)).status_code == 200
+    assert put(0).status_code == 200
+    assert put(2 * chunk).json["complete"]
+    response = client.post(f"{url}/complete")
+    assert response.status_code == 200
+    assert response.json["sha256"] == sha256
+    assert client.get(f"/uploads/{response.json['archivo']}").data == data
+
+def test_binary_upload_complete_during_chunk_retry(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path)})
+    client = app.test_client()
+    data = os.urandom(1024 * 1024)
+    upload_id = client.post("/binary/uploads", json={"size": len(data)}).json["upload_id"]
+    url = f"/binary/uploads/{upload_id}"
+    headers = {"Content-Range": f"bytes 0-{len(data) - 1}/{len(data)}"}
+    assert client.put(url, data=data, headers=headers).json["complete"]
+
+    # Un reintento del fragmento se detiene justo después de escribirse, con la subida
+    # ya completa pero la sesión todavía en uso
+    session = app.extensions["upload_sessions"].get(upload_id)
+    advance_hash = session._advance_hash
+    written, release = threading.Event(), threading.Event()
+
+    def blocking_advance_hash():
+        if not written.is_set():
+            written.set()
+            release.wait(5)
+        advance_hash()
+
+    session._advance_hash = blocking_advance_hash
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        retry = pool.submit(app.test_client().put, url, data=data, headers=headers)
+        assert written.wait(5)
+        response = client.post(f"{url}/complete")
+        assert response.status_code == 409
+        assert response.json["error"] == "Upload still receiving chunks"
+        release.set()
+        assert retry.result().status_code == 200
+
+    # La sesión no se ha descartado: se finaliza al terminar el reintento
+    response = client.post(f"{url}/complete")
+    assert response.status_code == 200
+    assert response.json["sha256"] == hashlib.sha256(data).hexdigest()
+    assert client.get(f"/uploads/{response.json['archivo']}").data == data
+    assert client.post(f"{url}/complete").status_code == 404
+
+def test_binary_upload_sessions_limited(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path), "MAX_UPLOAD_SESSIONS": 1})
+    client = app.test_client()
+    upload_sessions = app.extensions["upload_sessions"]
+    first = client.post("/binary/uploads", json={"size": 10}).json["upload_id"]
+    assert client.post("/binary/uploads", json={"size": 10}).status_code == 503
+
+    # Las sesiones inactivas caducan y se borra su fichero parcial
+    path = upload_sessions.get(first).path
+    upload_sessions.ttl = 0
+    second = client.post("/binary/uploads", json={"size": 10})
+    assert second.status_code == 201
+    assert client.get(f"/binary/uploads/{first}").status_code == 404
+    assert not os.path.exists(path)
+
+def test_uploads_deduplicated(tmp_path, monkeypatch):
+    app = create_app({"UPLOADS_DIR": str(tmp_path)})
+    client = app.test_client()
+    blob_store = app.extensions["blob_store"]
+    before = blob_store.stats()
+    data = os.urandom(256 * 1024)
+    fsyncs = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: fsyncs.append(fd) or fsync(fd))
+
+    first = client.post("/binary", data=data, content_type="application/octet-stream").json
+    assert len(fsyncs) == 1
+    second = client.post("/binary", data=data, content_type="application/octet-stream").json
+    assert len(fsyncs) == 1  # Un contenido repetido no se sincroniza con el disco
+    assert not first["duplicado"] and second["duplicado"]
+    assert first["sha256"] == second["sha256"] == hashlib.sha256(data).hexdigest()
+    assert first["archivo"] != second["archivo"]
+    stats = blob_store.stats()
+    assert stats["files"] == before["files"] + 2
+    assert stats["blobs"] == before["blobs"] + 1  # El contenido se guarda una sola vez
+
+    response = client.get(f"/uploads/{second['archivo']}")
+    assert response.data == data
+    assert response.headers["ETag"] == f'"{first["sha256"]}"'
+    assert client.get(f"/uploads/{second['archivo']}", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+    # El blob se conserva mientras lo use algún fichero
+    assert client.delete(f"/uploads/{first['archivo']}").status_code == 200
+    assert client.get(f"/uploads/{second['archivo']}").data == data
+    assert client.delete(f"/uploads/{second['archivo']}").status_code == 200
+    assert not os.path.exists(blob_store.blob_path(first["sha256"]))
+    assert blob_store.stats()["blobs"] == before["blobs"]
+    assert client.get(f"/uploads/{first['archivo']}").status_code == 404
+
+def test_blob_store_rejects_wrong_digest(tmp_path):
+    blob_store = BlobStore(str(tmp_path))
+    data = os.urandom(1024)
+    temp_path = tmp_path / "upload.part"
+    temp_path.write_bytes(os.urandom(1024))
+    # Un fichero con otro contenido no se guarda con el SHA-256 de `data`
+    with pytest.raises(ValueError):
+        blob_store.put_file(str(temp_path), hashlib.sha256(data).hexdigest(), len(data), "a.bin")
+    assert not temp_path.exists()
+    assert blob_store.stats()["blobs"] == 0
+
+    blob = blob_store.put_stream(io.BytesIO(data), "b.bin")
+    assert not blob.deduplicated
+    assert open(blob_store.path("b.bin"), "rb").read() == data
+
+def png_bytes(size, color):
+    img_bytes_io = io.BytesIO()
+    Image.new("RGB", size, color=color).save(img_bytes_io, format="PNG")
+    return img_bytes_io.getvalue()
+
+def wait_for_job(client, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f"/jobs/{job_id}").json
+        if job["status"] in ("done", "failed") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.05)
+
+def test_image_thumbnails(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path), "THUMBNAIL_SIZES": (16, 64), "THUMBNAIL_WORKERS": 1})
+    client = app.test_client()
+    img_bytes = png_bytes((200, 100), "blue")
+
+    first = client.post("/image", data=img_bytes, content_type="image/png")
+    assert first.status_code == 200
+    job = wait_for_job(client, first.json["job_id"])
+    assert job["status"] == "done"
+    assert (job["format"], job["width"], job["height"]) == ("PNG", 200, 100)
+    assert job["queue"] == {"pending": 0, "max": 32}
+
+    thumbnail = client.get(job["thumbnails"]["64"])
+    assert thumbnail.status_code == 200
+    assert thumbnail.content_type == "image/png"
+    assert Image.open(io.BytesIO(thumbnail.data)).size == (64, 32)
+    assert client.get(job["thumbnails"]["64"], headers={"If-None-Match": thumbnail.headers["ETag"]}).status_code == 304
+
+    # La misma imagen no se vuelve a procesar: sus miniaturas ya están en el almacén
+    response = client.post("/image", data=img_bytes, content_type="image/png")
+    assert client.get(f"/jobs/{response.json['job_id']}").json["thumbnails"] == job["thumbnails"]
+
+    assert client.get("/jobs/nojob").status_code == 404
+    assert client.get(f"/thumbnails/{response.json['sha256']}/128").status_code == 404
+    assert client.get("/thumbnails/../64").status_code == 404
+
+    # Las miniaturas se borran con el último fichero que usa la imagen
+    assert client.delete(f"/uploads/{first.json['archivo']}").status_code == 200
+    assert client.get(job["thumbnails"]["64"]).status_code == 200
+    assert client.delete(f"/uploads/{response.json['archivo']}").status_code == 200
+    assert client.get(job["thumbnails"]["64"]).status_code == 404
+    app.extensions["thumbnails"].shutdown()
+
+def test_image_thumbnails_invalid_image(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path), "THUMBNAIL_WORKERS": 1})
+    client = app.test_client()
+    response = client.post("/image", data=os.urandom(1024), content_type="image/png")
+    assert response.status_code == 200
+    job = wait_for_job(client, response.json["job_id"])
+    assert job["status"] == "failed"
+    assert "error" in job
+    app.extensions["thumbnails"].shutdown()
+
+def test_image_thumbnails_too_many_pixels(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path), "THUMBNAIL_WORKERS": 1, "THUMBNAIL_MAX_PIXELS": 100 * 100})
+    client = app.test_client()
+    response = client.post("/image", data=png_bytes((200, 100), "red"), content_type="image/png")
+    job = wait_for_job(client, response.json["job_id"])
+    assert job["status"] == "failed"
+    assert "too large" in job["error"]
+    app.extensions["thumbnails"].shutdown()
+
+def test_image_thumbnails_worker_killed(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path), "THUMBNAIL_WORKERS": 1})
+    client = app.test_client()
+    thumbnails = app.extensions["thumbnails"]
+    response = client.post("/image", data=png_bytes((20, 20), "red"), content_type="image/png")
+    assert wait_for_job(client, response.json["job_id"])["status"] == "done"
+
+    # Si muere un proceso del pool, las subidas siguen funcionando y se crea otro pool
+    for process in list(thumbnails._pool._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+    for i in range(50):
+        response = client.post("/image", data=png_bytes((20, 20), (i, 0, 0)), content_type="image/png")
+        assert response.status_code == 200
+        if wait_for_job(client, response.json["job_id"])["status"] == "done":
+            break
+    else:
+        pytest.fail("the thumbnail pool was not replaced")
+    thumbnails.shutdown()
+
+def test_image_thumbnails_queue_full(tmp_path):
+    app = create_app({"UPLOADS_DIR": str(tmp_path), "THUMBNAIL_QUEUE_SIZE": 1})
+    client = app.test_client()
+    thumbnails = app.extensions["thumbnails"]
+    thumbnails.reserve()
+    response = client.post("/image", data=b"\x89PNG", content_type="image/png")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+    thumbnails.release()
+    thumbnails.shutdown()
+
+def test_thumbnail_pipeline_not_kept_alive(tmp_path):
+    # El apagado al salir del intérprete no debe impedir liberar un pipeline sin usar
+    pipeline = ThumbnailPipeline(str(tmp_path))
+    ref = weakref.ref(pipeline)
+    del pipeline
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,126 @@
+"""
+Generación de imágenes con caché para el endpoint GET /image de ej2e2.
+
+Codificar una imagen en PNG es lo más costoso del endpoint, y para los mismos parámetros
+(tamaño, color y formato) el resultado es siempre el mismo. Por eso las imágenes ya
+codificadas se guardan en una caché LRU limitada por el número total de bytes: cuando se
+supera el límite, se descartan las menos usadas recientemente.
+
+El ETag de cada imagen se deriva de sus parámetros (y de la versión de Pillow), de modo
+que una petición con If-None-Match se puede responder con 304 sin generar la imagen.
+"""
+
+from collections import OrderedDict, namedtuple
+import hashlib
+import io
+import threading
+
+import PIL
+from PIL import Image, ImageColor
+
+# Formatos admitidos: nombre en la URL -> (formato de Pillow, tipo MIME)
+FORMATS = {
+    "png": ("PNG", "image/png"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "gif": ("GIF", "image/gif"),
+}
+# Lado máximo, en píxeles, de las imágenes generadas
+MAX_IMAGE_SIDE = 2000
+
+# Parámetros normalizados de una imagen: "red" y "#ff0000" dan la misma clave
+ImageKey = namedtuple("ImageKey", ["width", "height", "color", "format"])
+CachedImage = namedtuple("CachedImage", ["data", "mimetype", "etag"])
+
+
+def parse_image_params(size="100", color="red", image_format="png"):
+    """
+    Valida los parámetros de una imagen y devuelve su ImageKey.
+    `size` es un número ("100") o anchura x altura ("200x100").
+    Lanza ValueError si algún parámetro no es válido.
+    """
+    width, _, height = size.lower().partition("x")
+    if not width.isdigit() or (height and not height.isdigit()):
+        raise ValueError("size must be N or WIDTHxHEIGHT")
+    width = int(width)
+    height = int(height) if height else width
+    if not (0 < width <= MAX_IMAGE_SIDE and 0 < height <= MAX_IMAGE_SIDE):
+        raise ValueError(f"size must be between 1 and {MAX_IMAGE_SIDE}")
+    image_format = image_format.lower()
+    if image_format == "jpg":
+        image_format = "jpeg"
+    if image_format not in FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+    # getrgb lanza ValueError si no reconoce el color
+    rgb = ImageColor.getrgb(color)[:3]
+    return ImageKey(width, height, rgb, image_format)
+
+
+def image_etag(key):
+    """
+    ETag de una imagen, calculado sin generarla
+    """
+    return hashlib.sha1(repr((key, PIL.__version__)).encode()).hexdigest()[:20]
+
+
+def render_image(key):
+    """
+    Genera y codifica la imagen de color liso descrita por `key`
+    """
+    pil_format, mimetype = FORMATS[key.format]
+    img = Image.new("RGB", (key.width, key.height), color=key.color)
+    img_io = io.BytesIO()
+    img.save(img_io, pil_format)
+    return CachedImage(img_io.getvalue(), mimetype, image_etag(key))
+
+
+class ImageCache:
+    """
+    Caché LRU de imágenes codificadas que ocupa como mucho `max_bytes` bytes
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._images)
+
+    def __contains__(self, key):
+        return key in self._images
+
+    def get(self, key):
+        """
+        Devuelve la imagen de `key`, generándola si no está en la caché
+        """
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                return image
+        # Se genera fuera del lock para no bloquear a las demás peticiones
+        image = render_image(key)
+        self._put(key, image)
+        return image
+
+    def _put(self, key, image):
+        if len(image.data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = image
+            self.size += len(image.data)
+            while self.size > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self.size -= len(evicted.data)
+
+    def warm_up(self, keys):
+        """
+        Genera por adelantado las imágenes de `keys`. La primera codificación también
+        carga los módulos de Pillow para cada formato, que no se importan hasta usarlos.
+        """
+        Image.init()
+        for key in keys:
+            self.get(key)
@@ -0,0 +1,267 @@
+"""
+Generación de miniaturas de las imágenes subidas a ej2e3.
+
+Decodificar y redimensionar una imagen ocupa la CPU durante bastante tiempo, y en un
+hilo del servidor bloquearía a las demás peticiones (el GIL impide que los hilos de
+Python hagan ese trabajo en paralelo). Por eso cada imagen subida genera un trabajo que
+se ejecuta en un `ProcessPoolExecutor`:
+
+1. Se abre la imagen con Pillow y se comprueba que es un PNG o JPEG válido.
+2. Se generan las miniaturas de cada tamaño (el lado mayor mide como mucho ese tamaño).
+3. Se guardan en el almacén de derivados: `derived/<sha256 de la imagen>/<tamaño>.<ext>`.
+   Como dependen solo del contenido, una imagen subida varias veces se procesa una vez.
+
+El número de trabajos pendientes está limitado. Cuando la cola está llena, las subidas
+nuevas se rechazan (503) antes de leer su cuerpo, en lugar de acumular trabajo sin fin.
+También se limita el número de píxeles de las imágenes: un PNG de pocos KB puede
+describir una imagen enorme, que ocuparía cientos de MB al decodificarla.
+
+Los procesos del pool se crean con "spawn" (no con fork desde un hilo del servidor) la
+primera vez que hacen falta. Si uno muere (por ejemplo, por falta de memoria), el pool
+queda inservible: se crea otro y solo falla el trabajo afectado, no la subida.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import atexit
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+
+from PIL import Image
+
+# Tamaños por defecto de las miniaturas (lado mayor, en píxeles)
+THUMBNAIL_SIZES = (64, 256)
+# Formatos de imagen admitidos y extensión con que se guardan sus miniaturas
+THUMBNAIL_FORMATS = {"PNG": "png", "JPEG": "jpg"}
+# Número máximo de píxeles (anchura x altura) de las imágenes que se procesan
+MAX_IMAGE_PIXELS = 50_000_000
+# Número de trabajos terminados cuyo estado se conserva
+MAX_FINISHED_JOBS = 1000
+
+
+class QueueFull(Exception):
+    """
+    La cola de trabajos está llena
+    """
+
+
+def thumbnail_name(size, image_format):
+    return f"{size}.{THUMBNAIL_FORMATS[image_format]}"
+
+
+def make_thumbnails(source_path, output_dir, sizes, max_pixels=MAX_IMAGE_PIXELS):
+    """
+    Genera las miniaturas de la imagen `source_path` en `output_dir`. Se ejecuta en un
+    proceso del pool. Devuelve el formato, las dimensiones originales y los ficheros
+    generados por tamaño. Lanza ValueError si el fichero no es una imagen admitida o
+    tiene más de `max_pixels` píxeles.
+    """
+    try:
+        img = Image.open(source_path)
+        image_format = img.format
+        if image_format not in THUMBNAIL_FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        width, height = img.size
+        # Image.open solo ha leído la cabecera: se comprueba antes de decodificar
+        if width * height > max_pixels:
+            raise ValueError(f"Image too large: {width}x{height} pixels")
+        # En JPEG, draft() decodifica directamente a una escala reducida (1/2, 1/4 o
+        # 1/8), mucho más rápido que decodificar la imagen entera y reducirla después
+        img.draft("RGB", (max(sizes), max(sizes)))
+        img.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Invalid image: {e}") from None
+
+    os.makedirs(output_dir, exist_ok=True)
+    files = {}
+    # De mayor a menor, reduciendo cada miniatura a partir de la anterior
+    for size in sorted(sizes, reverse=True):
+        img.thumbnail((size, size))
+        name = thumbnail_name(size, image_format)
+        fd, temp_path = tempfile.mkstemp(dir=output_dir, prefix=".thumbnail-")
+        try:
+            with open(fd, "wb") as f:
+                img.save(f, image_format)
+            os.replace(temp_path, os.path.join(output_dir, name))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        files[size] = name
+    return {"format": image_format, "width": width, "height": height, "thumbnails": files}
+
+
+# Pipelines que hay que detener al salir del intérprete. Las referencias son débiles
+# para que un pipeline que ya no se usa se pueda liberar
+_pipelines = weakref.WeakSet()
+
+
+def _shutdown_pipelines():
+    for pipeline in list(_pipelines):
+        pipeline.shutdown()
+
+
+atexit.register(_shutdown_pipelines)
+
+
+class ThumbnailPipeline:
+    """
+    Cola acotada de trabajos de miniaturas ejecutados en un pool de procesos.
+
+    Antes de aceptar una subida se reserva un hueco en la cola con `reserve()`, que lanza
+    QueueFull si no queda ninguno; `submit()` ocupa el hueco con el trabajo, y
+    `release()` lo devuelve si la subida falla.
+    """
+
+    def __init__(self, directory, sizes=THUMBNAIL_SIZES, max_workers=None, max_pending=32,
+                 max_pixels=MAX_IMAGE_PIXELS):
+        self.directory = directory
+        self.sizes = tuple(sizes)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_pixels = max_pixels
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._futures = {}
+        self._lock = threading.Lock()
+        _pipelines.add(self)
+
+    @property
+    def pending(self):
+        """
+        Número de trabajos en cola o en ejecución
+        """
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] == "queued")
+
+    def output_dir(self, digest):
+        return os.path.join(self.directory, digest)
+
+    def thumbnail_path(self, digest, size):
+        """
+        Devuelve la ruta de la miniatura de una imagen, o None si no existe
+        """
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            return None
+        output_dir = self.output_dir(digest)
+        for extension in THUMBNAIL_FORMATS.values():
+            path = os.path.join(output_dir, f"{size}.{extension}")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def discard(self, digest):
+        """
+        Borra las miniaturas de una imagen
+        """
+        shutil.rmtree(self.output_dir(digest), ignore_errors=True)
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _replace_pool(self, broken):
+        """
+        Sustituye un pool que ha perdido un proceso por uno nuevo (si otro hilo no lo ha
+        hecho ya)
+        """
+        with self._lock:
+            if self._pool is broken:
+                self._pool = None
+        broken.shutdown(wait=False)
+
+    def reserve(self):
+        if not self._slots.acquire(blocking=False):
+            raise QueueFull()
+
+    def release(self):
+        self._slots.release()
+
+    def submit(self, digest, source_path):
+        """
+        Crea el trabajo de miniaturas de una imagen (ocupando el hueco reservado) y
+        devuelve su ID. Si no se puede encargar al pool, el trabajo queda como fallido.
+        """
+        job_id = os.urandom(8).hex()
+        job = {"job_id": job_id, "status": "queued", "digest": digest}
+        with self._lock:
+            self._jobs[job_id] = job
+        if all(self.thumbnail_path(digest, size) for size in self.sizes):
+            # La misma imagen ya se procesó antes: no hace falta repetir el trabajo
+            self._finish(job_id, {"thumbnails": dict.fromkeys(self.sizes)}, None)
+            return job_id
+        args = (make_thumbnails, source_path, self.output_dir(digest), self.sizes, self.max_pixels)
+        try:
+            pool = self._get_pool()
+            try:
+                future = pool.submit(*args)
+            except BrokenProcessPool:
+                # Un proceso del pool murió: se sustituye el pool y se reintenta una vez
+                self._replace_pool(pool)
+                future = self._get_pool().submit(*args)
+        except Exception as e:
+            self._finish(job_id, None, e)
+            return job_id
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f: self._done(job_id, f))
+        return job_id
+
+    def _done(self, job_id, future):
+        if future.cancelled():
+            self._finish(job_id, None, "Cancelled")
+        elif future.exception() is not None:
+            self._finish(job_id, None, future.exception())
+        else:
+            self._finish(job_id, future.result(), None)
+
+    def _finish(self, job_id, result, error):
+        with self._lock:
+            self._futures.pop(job_id, None)
+            job = self._jobs[job_id]
+            if error is None:
+                job["status"] = "done"
+                job.update((key, result[key]) for key in ("format", "width", "height") if key in result)
+                job["sizes"] = sorted(result["thumbnails"])
+            else:
+                job["status"] = "failed"
+                job["error"] = str(error)
+            # Se olvidan los trabajos terminados más antiguos
+            finished = [old_id for old_id, other in self._jobs.items() if other["status"] in ("done", "failed")]
+            for old_id in finished[:-MAX_FINISHED_JOBS]:
+                del self._jobs[old_id]
+        self._slots.release()
+
+    def status(self, job_id):
+        """
+        Devuelve el estado de un trabajo ("queued", "running", "done" o "failed"),
+        o None si no existe
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            future = self._futures.get(job_id)
+            if future is not None and future.running():
+                job["status"] = "running"
+        return job
+
+    def shutdown(self):
+        """
+        Detiene el pool, cancelando los trabajos que aún no han empezado
+        """
+        _pipelines.discard(self)
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
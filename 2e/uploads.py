@@ -0,0 +1,300 @@
+"""
+Subidas de ficheros por fragmentos para el endpoint /binary de ej2e3.
+
+Una subida grande en una sola petición se pierde entera si falla la conexión. Con una
+sesión de subida el cliente:
+
+1. Crea la sesión indicando el tamaño total del fichero.
+2. Envía el fichero en fragmentos, cada uno en una petición con su Content-Range.
+   Los fragmentos pueden llegar en cualquier orden y en paralelo, y un fragmento que
+   falla se vuelve a enviar sin repetir el resto.
+3. Finaliza la sesión cuando se han recibido todos los bytes, y el fichero pasa al
+   almacén de ficheros subidos (ver blob_store.py).
+
+Cada fragmento se escribe directamente en su posición (`os.pwrite`) dentro de un fichero
+disperso del tamaño final, así que varios fragmentos se escriben a la vez sin bloquearse.
+El SHA-256 del fichero se calcula a medida que se completa el tramo inicial contiguo, de
+modo que al finalizar ya está calculado. Un fragmento que se vuelve a enviar deja de
+contar como recibido mientras se escribe (y si su checksum no coincide, hay que enviarlo
+otra vez); si el SHA-256 ya había leído esa parte, se vuelve a calcular desde el principio.
+
+Las sesiones se guardan en memoria: si el servidor se reinicia, se pierden. Cada sesión
+abierta ocupa un descriptor de fichero y espacio en disco, así que su número está
+limitado y las que llevan demasiado tiempo sin recibir datos se borran.
+"""
+
+from contextlib import contextmanager
+import hashlib
+import os
+import threading
+import time
+
+from body_streams import UPLOAD_CHUNK_SIZE
+
+# Segundos sin actividad tras los que se borra una sesión de subida
+UPLOAD_TTL = 3600
+# Número máximo de sesiones de subida abiertas a la vez
+MAX_UPLOAD_SESSIONS = 100
+
+
+class UploadError(Exception):
+    """
+    Fragmento o finalización no válidos. `status` es el código HTTP que corresponde.
+    """
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class UploadSession:
+    """
+    Sesión de subida de un fichero de `size` bytes, guardado en `path` mientras se recibe
+    """
+
+    def __init__(self, upload_id, path, size, sha256=None):
+        self.upload_id = upload_id
+        self.path = path
+        self.size = size
+        # SHA-256 esperado, si el cliente lo indicó al crear la sesión
+        self.expected_sha256 = sha256
+        # Tramos recibidos [inicio, fin), ordenados y sin solapes
+        self.ranges = []
+        self._lock = threading.Lock()
+        self._hash_lock = threading.Lock()
+        self._hasher = hashlib.sha256()
+        self._hashed = 0
+        # Hasta dónde ha leído (o está leyendo) el SHA-256; una escritura por debajo lo
+        # invalida y `_rehash` indica que hay que volver a empezar
+        self._hash_limit = 0
+        self._rehash = False
+        # Peticiones que están usando el fichero: no se cierra hasta que terminan
+        self._users = 0
+        self._discarded = False
+        self.last_activity = time.monotonic()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_EXCL, 0o644)
+        # Fichero disperso: ocupa espacio en disco solo a medida que se escribe
+        os.ftruncate(self._fd, size)
+
+    @property
+    def received(self):
+        with self._lock:
+            return sum(stop - start for start, stop in self.ranges)
+
+    @property
+    def complete(self):
+        with self._lock:
+            return self.ranges == [[0, self.size]]
+
+    @property
+    def idle(self):
+        """
+        Segundos desde la última actividad, o 0 si alguna petición está usando la sesión
+        """
+        with self._lock:
+            return 0 if self._users else time.monotonic() - self.last_activity
+
+    @contextmanager
+    def _in_use(self):
+        with self._lock:
+            if self._discarded or self._fd is None:
+                raise UploadError("Upload not found", 404)
+            self._users += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._users -= 1
+                self.last_activity = time.monotonic()
+                self._close_if_discarded()
+
+    def missing(self):
+        """
+        Devuelve los tramos [inicio, fin) que faltan por recibir
+        """
+        with self._lock:
+            missing = []
+            position = 0
+            for start, stop in self.ranges:
+                if start > position:
+                    missing.append([position, start])
+                position = stop
+            if position < self.size:
+                missing.append([position, self.size])
+            return missing
+
+    def write_chunk(self, stream, start, stop, sha256=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        """
+        Escribe en [start, stop) los datos de `stream`. Si se indica `sha256`, el tramo
+        solo se da por recibido si los datos coinciden con él.
+        """
+        if not 0 <= start < stop <= self.size:
+            raise UploadError("Content-Range outside the upload", 416)
+        with self._in_use():
+            self._invalidate(start, stop)
+            self._write_chunk(stream, start, stop, sha256, chunk_size)
+            self._add_range(start, stop)
+            self._advance_hash()
+
+    def _write_chunk(self, stream, start, stop, sha256, chunk_size):
+        hasher = hashlib.sha256() if sha256 else None
+        offset = start
+        while offset < stop:
+            data = stream.read(min(chunk_size, stop - offset))
+            if not data:
+                raise UploadError("Chunk shorter than its Content-Range")
+            if hasher:
+                hasher.update(data)
+            view = memoryview(data)
+            while view:
+                written = os.pwrite(self._fd, view, offset)
+                view = view[written:]
+                offset += written
+        if stream.read(1):
+            raise UploadError("Chunk longer than its Content-Range")
+        if hasher and hasher.hexdigest() != sha256.lower():
+            raise UploadError("Chunk checksum mismatch")
+
+    def _invalidate(self, start, stop):
+        """
+        Quita [start, stop) de los tramos recibidos antes de escribir en él. Si la escritura
+        falla, el tramo queda pendiente: sus datos anteriores ya se han podido sobrescribir.
+        """
+        with self._lock:
+            remaining = []
+            for range_start, range_stop in self.ranges:
+                if range_stop <= start or range_start >= stop:
+                    remaining.append([range_start, range_stop])
+                    continue
+                if range_start < start:
+                    remaining.append([range_start, start])
+                if range_stop > stop:
+                    remaining.append([stop, range_stop])
+            self.ranges = remaining
+            if start < self._hash_limit:
+                self._rehash = True
+
+    def _add_range(self, start, stop):
+        with self._lock:
+            merged = []
+            for range_start, range_stop in self.ranges:
+                if range_stop < start or range_start > stop:
+                    merged.append([range_start, range_stop])
+                else:
+                    start, stop = min(start, range_start), max(stop, range_stop)
+            merged.append([start, stop])
+            merged.sort()
+            self.ranges = merged
+
+    def _advance_hash(self, chunk_size=UPLOAD_CHUNK_SIZE):
+        """
+        Añade al SHA-256 los bytes que ya forman un tramo contiguo desde el principio.
+        Los datos se releen del fichero, que normalmente sigue en la caché del sistema.
+        Si entre tanto se reescribe una parte ya leída, se vuelve a empezar.
+        """
+        with self._hash_lock:
+            while True:
+                with self._lock:
+                    if self._rehash:
+                        self._hasher = hashlib.sha256()
+                        self._hashed = 0
+                        self._rehash = False
+                    end = self.ranges[0][1] if self.ranges and self.ranges[0][0] == 0 else 0
+                    if self._hashed >= end:
+                        return
+                    self._hash_limit = min(end, self._hashed + chunk_size)
+                data = os.pread(self._fd, self._hash_limit - self._hashed, self._hashed)
+                self._hasher.update(data)
+                self._hashed += len(data)
+
+    def finish(self):
+        """
+        Comprueba que la subida está completa y su checksum, y cierra el fichero, que
+        queda listo en `path`. Devuelve el SHA-256 del fichero. El fichero no se sincroniza
+        con el disco: lo hace el almacén de ficheros subidos si su contenido es nuevo.
+        """
+        with self._in_use():
+            self._advance_hash()
+            with self._lock:
+                if self.ranges != [[0, self.size]] or self._rehash or self._hashed != self.size:
+                    raise UploadError("Upload incomplete", 409)
+                if self._users > 1:
+                    raise UploadError("Upload still receiving chunks", 409)
+                digest = self._hasher.hexdigest()
+                if self.expected_sha256 and digest != self.expected_sha256.lower():
+                    raise UploadError("Checksum mismatch")
+                os.close(self._fd)
+                self._fd = None
+        return digest
+
+    def discard(self):
+        """
+        Cierra y borra el fichero parcial, en cuanto no lo use ninguna petición
+        """
+        with self._lock:
+            self._discarded = True
+            self._close_if_discarded()
+
+    def _close_if_discarded(self):
+        # Se llama con self._lock adquirido
+        if self._discarded and not self._users and self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            os.unlink(self.path)
+
+    def to_dict(self):
+        return {
+            "upload_id": self.upload_id,
+            "size": self.size,
+            "received": self.received,
+            "missing": self.missing(),
+            "complete": self.complete,
+        }
+
+
+class UploadSessions:
+    """
+    Sesiones de subida abiertas, con sus ficheros parciales en `directory`.
+
+    Las sesiones que llevan `ttl` segundos sin actividad se borran, y no se admiten más
+    de `max_sessions` a la vez.
+    """
+
+    def __init__(self, directory, ttl=UPLOAD_TTL, max_sessions=MAX_UPLOAD_SESSIONS):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def create(self, size, sha256=None):
+        self.expire()
+        upload_id = os.urandom(8).hex()
+        path = os.path.join(self.directory, f".upload-{upload_id}.part")
+        with self._lock:
+            if len(self._sessions) >= self.max_sessions:
+                raise UploadError("Too many uploads in progress", 503)
+            session = UploadSession(upload_id, path, size, sha256)
+            self._sessions[upload_id] = session
+        return session
+
+    def get(self, upload_id):
+        self.expire()
+        return self._sessions.get(upload_id)
+
+    def expire(self):
+        """
+        Borra las sesiones que llevan más de `ttl` segundos sin actividad
+        """
+        with self._lock:
+            expired = [upload_id for upload_id, session in self._sessions.items() if session.idle > self.ttl]
+            sessions = [self._sessions.pop(upload_id) for upload_id in expired]
+        for session in sessions:
+            session.discard()
+
+    def pop(self, upload_id):
+        with self._lock:
+            return self._sessions.pop(upload_id, None)